@@ -0,0 +1,84 @@
+"""added search vectors
+
+Revision ID: 2f6a8c0d4e91
+Revises: 9c4e1b7d2a36
+Create Date: 2026-10-18 17:40:22.913507
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f6a8c0d4e91'
+down_revision: Union[str, Sequence[str], None] = '9c4e1b7d2a36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'posts',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('english', coalesce(text, ''))", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.add_column(
+        'post_replies',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('english', reply)", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.add_column(
+        'users',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "to_tsvector('simple', first_name || ' ' || last_name)",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        'ix_posts_search_vector',
+        'posts',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+    op.create_index(
+        'ix_post_replies_search_vector',
+        'post_replies',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+    op.create_index(
+        'ix_users_search_vector',
+        'users',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_search_vector', table_name='users')
+    op.drop_index('ix_post_replies_search_vector', table_name='post_replies')
+    op.drop_index('ix_posts_search_vector', table_name='posts')
+    op.drop_column('users', 'search_vector')
+    op.drop_column('post_replies', 'search_vector')
+    op.drop_column('posts', 'search_vector')
@@ -0,0 +1,46 @@
+"""added like and reply counters
+
+Revision ID: 5a7c3d9e1f20
+Revises: 8d2e6b0f4c17
+Create Date: 2026-10-18 13:05:52.871604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a7c3d9e1f20'
+down_revision: Union[str, Sequence[str], None] = '8d2e6b0f4c17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('posts', sa.Column('reply_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('post_replies', sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute(
+        """
+        UPDATE posts SET
+            like_count = (SELECT count(*) FROM post_likes WHERE post_likes.post_id = posts.id),
+            reply_count = (SELECT count(*) FROM post_replies WHERE post_replies.post_id = posts.id)
+        """
+    )
+    op.execute(
+        """
+        UPDATE post_replies SET
+            like_count = (SELECT count(*) FROM reply_likes WHERE reply_likes.reply_id = post_replies.id)
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('post_replies', 'like_count')
+    op.drop_column('posts', 'reply_count')
+    op.drop_column('posts', 'like_count')
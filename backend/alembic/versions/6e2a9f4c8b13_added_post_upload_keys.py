@@ -0,0 +1,30 @@
+"""added post upload keys
+
+Revision ID: 6e2a9f4c8b13
+Revises: a3e9d7f1b264
+Create Date: 2026-10-18 20:41:09.318442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2a9f4c8b13'
+down_revision: Union[str, Sequence[str], None] = 'a3e9d7f1b264'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('upload_key', sa.String(), nullable=True))
+    op.create_unique_constraint('uq_posts_upload_key', 'posts', ['upload_key'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_posts_upload_key', 'posts', type_='unique')
+    op.drop_column('posts', 'upload_key')
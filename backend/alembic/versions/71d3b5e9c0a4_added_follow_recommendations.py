@@ -0,0 +1,46 @@
+"""added follow recommendations
+
+Revision ID: 71d3b5e9c0a4
+Revises: 2f6a8c0d4e91
+Create Date: 2026-10-18 18:05:51.207446
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '71d3b5e9c0a4'
+down_revision: Union[str, Sequence[str], None] = '2f6a8c0d4e91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'follow_recommendations',
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('candidate_id', sa.UUID(), nullable=False),
+        sa.Column('score', sa.Integer(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['candidate_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'candidate_id'),
+    )
+    op.create_index(
+        'ix_follow_recommendations_user_score',
+        'follow_recommendations',
+        ['user_id', sa.text('score DESC'), 'candidate_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        'ix_follow_recommendations_user_score', table_name='follow_recommendations'
+    )
+    op.drop_table('follow_recommendations')
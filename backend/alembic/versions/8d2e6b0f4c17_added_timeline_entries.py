@@ -0,0 +1,56 @@
+"""added timeline entries
+
+Revision ID: 8d2e6b0f4c17
+Revises: 3c1f9a7e2b45
+Create Date: 2026-10-18 11:40:07.518392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e6b0f4c17'
+down_revision: Union[str, Sequence[str], None] = '3c1f9a7e2b45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('timeline_entries',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('post_id', sa.UUID(), nullable=False),
+    sa.Column('author_id', sa.UUID(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['author_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'post_id')
+    )
+    op.create_index(
+        'ix_timeline_entries_user_created',
+        'timeline_entries',
+        ['user_id', sa.text('created_at DESC'), sa.text('post_id DESC')],
+        unique=False,
+    )
+
+    # seed every user's timeline with the posts of the people they follow
+    op.execute(
+        """
+        INSERT INTO timeline_entries (user_id, post_id, author_id, created_at)
+        SELECT f.follower_id, p.id, p.user_id, p.created_at
+        FROM followers f JOIN posts p ON p.user_id = f.followee_id
+        UNION
+        SELECT p.user_id, p.id, p.user_id, p.created_at
+        FROM posts p
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_timeline_entries_user_created', table_name='timeline_entries')
+    op.drop_table('timeline_entries')
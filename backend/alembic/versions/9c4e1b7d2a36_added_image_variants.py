@@ -0,0 +1,30 @@
+"""added image variants
+
+Revision ID: 9c4e1b7d2a36
+Revises: e5f80c3a7b19
+Create Date: 2026-10-18 17:12:40.584113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e1b7d2a36'
+down_revision: Union[str, Sequence[str], None] = 'e5f80c3a7b19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('posts', sa.Column('image_variants', sa.JSON(), nullable=True))
+    op.add_column('users', sa.Column('image_variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'image_variants')
+    op.drop_column('posts', 'image_variants')
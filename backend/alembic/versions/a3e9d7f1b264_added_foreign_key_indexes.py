@@ -0,0 +1,98 @@
+"""added foreign key indexes
+
+Revision ID: a3e9d7f1b264
+Revises: c82f4d6a1e57
+Create Date: 2026-10-18 18:58:37.140925
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e9d7f1b264'
+down_revision: Union[str, Sequence[str], None] = 'c82f4d6a1e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # drop duplicate likes left by the old check-then-insert toggle,
+    # then recount the affected counters
+    op.execute(
+        """
+        DELETE FROM post_likes a USING post_likes b
+        WHERE a.user_id = b.user_id AND a.post_id = b.post_id AND a.id > b.id
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM reply_likes a USING reply_likes b
+        WHERE a.user_id = b.user_id AND a.reply_id = b.reply_id AND a.id > b.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE posts SET like_count = (
+            SELECT count(*) FROM post_likes WHERE post_likes.post_id = posts.id
+        )
+        """
+    )
+    op.execute(
+        """
+        UPDATE post_replies SET like_count = (
+            SELECT count(*) FROM reply_likes
+            WHERE reply_likes.reply_id = post_replies.id
+        )
+        """
+    )
+
+    op.create_unique_constraint(
+        'uq_post_likes_user_post', 'post_likes', ['user_id', 'post_id']
+    )
+    op.create_index('ix_post_likes_post_id', 'post_likes', ['post_id'], unique=False)
+    op.create_unique_constraint(
+        'uq_reply_likes_user_reply', 'reply_likes', ['user_id', 'reply_id']
+    )
+    op.create_index(
+        'ix_reply_likes_reply_id', 'reply_likes', ['reply_id'], unique=False
+    )
+    op.create_index(
+        'ix_post_replies_post_created_at',
+        'post_replies',
+        ['post_id', 'created_at'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_posts_user_created_at',
+        'posts',
+        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False,
+    )
+    op.create_index(
+        'ix_chat_participants_chat_id',
+        'chat_participants',
+        ['chat_id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_timeline_entries_user_author',
+        'timeline_entries',
+        ['user_id', 'author_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_timeline_entries_user_author', table_name='timeline_entries')
+    op.drop_index('ix_chat_participants_chat_id', table_name='chat_participants')
+    op.drop_index('ix_posts_user_created_at', table_name='posts')
+    op.drop_index('ix_post_replies_post_created_at', table_name='post_replies')
+    op.drop_index('ix_reply_likes_reply_id', table_name='reply_likes')
+    op.drop_constraint('uq_reply_likes_user_reply', 'reply_likes', type_='unique')
+    op.drop_index('ix_post_likes_post_id', table_name='post_likes')
+    op.drop_constraint('uq_post_likes_user_post', 'post_likes', type_='unique')
@@ -0,0 +1,57 @@
+"""added chat last message
+
+Revision ID: b47e2a91c6d3
+Revises: 5a7c3d9e1f20
+Create Date: 2026-10-18 15:21:36.940127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b47e2a91c6d3'
+down_revision: Union[str, Sequence[str], None] = '5a7c3d9e1f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chats', sa.Column('last_message_id', sa.UUID(), nullable=True))
+    op.add_column('chats', sa.Column('last_message_at', sa.DateTime(), nullable=True))
+    op.create_foreign_key(
+        'fk_chats_last_message_id', 'chats', 'messages',
+        ['last_message_id'], ['id'], ondelete='SET NULL',
+    )
+    op.create_index(
+        'ix_chats_user1_last_message_at', 'chats',
+        ['user1_id', sa.text('last_message_at DESC')], unique=False,
+    )
+    op.create_index(
+        'ix_chats_user2_last_message_at', 'chats',
+        ['user2_id', sa.text('last_message_at DESC')], unique=False,
+    )
+
+    op.execute(
+        """
+        UPDATE chats SET last_message_id = m.id, last_message_at = m.created_at
+        FROM (
+            SELECT DISTINCT ON (chat_id) id, chat_id, created_at
+            FROM messages
+            ORDER BY chat_id, created_at DESC
+        ) m
+        WHERE m.chat_id = chats.id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_chats_user2_last_message_at', table_name='chats')
+    op.drop_index('ix_chats_user1_last_message_at', table_name='chats')
+    op.drop_constraint('fk_chats_last_message_id', 'chats', type_='foreignkey')
+    op.drop_column('chats', 'last_message_at')
+    op.drop_column('chats', 'last_message_id')
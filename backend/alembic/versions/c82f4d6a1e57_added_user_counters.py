@@ -0,0 +1,60 @@
+"""added user counters
+
+Revision ID: c82f4d6a1e57
+Revises: 71d3b5e9c0a4
+Create Date: 2026-10-18 18:31:09.664820
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c82f4d6a1e57'
+down_revision: Union[str, Sequence[str], None] = '71d3b5e9c0a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'users',
+        sa.Column('post_count', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.add_column(
+        'users',
+        sa.Column('follower_count', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.add_column(
+        'users',
+        sa.Column('following_count', sa.Integer(), server_default='0', nullable=False),
+    )
+    op.create_index(
+        'ix_followers_followee_id', 'followers', ['followee_id'], unique=False
+    )
+
+    op.execute(
+        """
+        UPDATE users SET
+            post_count = (
+                SELECT count(*) FROM posts WHERE posts.user_id = users.id
+            ),
+            follower_count = (
+                SELECT count(*) FROM followers WHERE followers.followee_id = users.id
+            ),
+            following_count = (
+                SELECT count(*) FROM followers WHERE followers.follower_id = users.id
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_followers_followee_id', table_name='followers')
+    op.drop_column('users', 'following_count')
+    op.drop_column('users', 'follower_count')
+    op.drop_column('users', 'post_count')
@@ -0,0 +1,33 @@
+"""added messages history index
+
+Revision ID: e5f80c3a7b19
+Revises: b47e2a91c6d3
+Create Date: 2026-10-18 16:48:03.115270
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f80c3a7b19'
+down_revision: Union[str, Sequence[str], None] = 'b47e2a91c6d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_messages_chat_created_at_id',
+        'messages',
+        ['chat_id', 'created_at', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_chat_created_at_id', table_name='messages')
@@ -1,4 +1,8 @@
+import asyncio, hashlib, io, mimetypes, os
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from fastapi import UploadFile
 from .config import settings
 
 
@@ -7,6 +11,106 @@ storage = boto3.client(
     aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
     aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
     region_name=settings.AWS_REGION,
+    endpoint_url=settings.AWS_ENDPOINT_URL,
 )
 
 BUCKET = settings.AWS_BUCKET_NAME
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+IMAGE_CONTENT_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
+
+PRESIGNED_UPLOAD_EXPIRES = 300
+
+# files above 8MB go up as a multipart upload in 8MB parts
+transfer_config = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+)
+
+upload_slots = asyncio.Semaphore(settings.S3_MAX_CONCURRENT_UPLOADS)
+
+
+def object_url(key: str) -> str:
+    if settings.AWS_ENDPOINT_URL:
+        return f"{settings.AWS_ENDPOINT_URL.rstrip('/')}/{BUCKET}/{key}"
+    return f"https://{BUCKET}.s3.amazonaws.com/{key}"
+
+
+def key_from_url(url: str) -> str | None:
+    prefix = object_url("")
+    if not url.startswith(prefix):
+        return None
+    return url[len(prefix) :]
+
+
+def _upload(fileobj, key: str, content_type: str | None) -> None:
+    # keys are content hashes, an existing object already has these bytes
+    try:
+        storage.head_object(Bucket=BUCKET, Key=key)
+        return
+    except ClientError as error:
+        if error.response["Error"]["Code"] not in ("404", "NoSuchKey"):
+            raise
+
+    extra_args = {"ContentType": content_type} if content_type else None
+    storage.upload_fileobj(
+        Fileobj=fileobj,
+        Bucket=BUCKET,
+        Key=key,
+        ExtraArgs=extra_args,
+        Config=transfer_config,
+    )
+
+
+async def upload_image(image: UploadFile, prefix: str = "images") -> str:
+    """Stream an upload to S3 under a content-addressed key and return its URL."""
+    digest = hashlib.sha256()
+    while chunk := await image.read(UPLOAD_CHUNK_SIZE):
+        digest.update(chunk)
+    await image.seek(0)
+
+    extension = os.path.splitext(image.filename or "")[1].lower()
+    if not extension and image.content_type:
+        extension = mimetypes.guess_extension(image.content_type) or ""
+    key = f"{prefix}/{digest.hexdigest()}{extension}"
+
+    # boto3 is blocking, run the transfer off the event loop
+    async with upload_slots:
+        await asyncio.to_thread(_upload, image.file, key, image.content_type)
+
+    return object_url(key)
+
+
+async def store_object(content: bytes, key: str, content_type: str) -> str:
+    async with upload_slots:
+        await asyncio.to_thread(_upload, io.BytesIO(content), key, content_type)
+    return object_url(key)
+
+
+def presign_image_upload(key: str, content_type: str) -> dict:
+    """Presigned POST policy: the client sends the bytes straight to S3.
+
+    S3 enforces the content type and the size limit, the policy is signed
+    locally so this makes no network call.
+    """
+    return storage.generate_presigned_post(
+        Bucket=BUCKET,
+        Key=key,
+        Fields={"Content-Type": content_type},
+        Conditions=[
+            {"Content-Type": content_type},
+            ["content-length-range", 1, settings.MAX_IMAGE_SIZE],
+        ],
+        ExpiresIn=PRESIGNED_UPLOAD_EXPIRES,
+    )
+
+
+async def stat_object(key: str) -> dict | None:
+    try:
+        return await asyncio.to_thread(storage.head_object, Bucket=BUCKET, Key=key)
+    except ClientError as error:
+        if error.response["Error"]["Code"] in ("404", "NoSuchKey"):
+            return None
+        raise
@@ -0,0 +1,155 @@
+import abc, asyncio, logging
+from typing import Awaitable, Callable
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[str], Awaitable[None]]
+
+
+class Broker(abc.ABC):
+    """Pub/sub channel between the workers that hold websocket connections.
+
+    A worker subscribes to a channel while it has local sockets for it;
+    publish reaches the handler of every subscribed worker, including
+    the publishing one.
+    """
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def subscribe(self, channel: str, handler: Handler) -> None: ...
+
+    @abc.abstractmethod
+    async def unsubscribe(self, channel: str) -> None: ...
+
+    @abc.abstractmethod
+    async def publish(self, channel: str, message: str) -> None: ...
+
+
+class InMemoryBroker(Broker):
+    """Single worker deployments: publish calls the local handler directly."""
+
+    def __init__(self) -> None:
+        self.handlers: dict[str, Handler] = {}
+
+    async def subscribe(self, channel: str, handler: Handler) -> None:
+        self.handlers[channel] = handler
+
+    async def unsubscribe(self, channel: str) -> None:
+        self.handlers.pop(channel, None)
+
+    async def publish(self, channel: str, message: str) -> None:
+        handler = self.handlers.get(channel)
+        if handler:
+            await handler(message)
+
+
+class PostgresBroker(Broker):
+    """LISTEN/NOTIFY on the application database.
+
+    One connection per worker LISTENs on the channels it has sockets for,
+    a small pool sends the NOTIFYs. Postgres caps a payload at 8000 bytes,
+    larger messages are dropped with an error in the log.
+    """
+
+    def __init__(self, dsn: str) -> None:
+        self.dsn = dsn
+        self.handlers: dict[str, Handler] = {}
+        self.listening: set[str] = set()
+        self.lock = asyncio.Lock()
+        self.listener: asyncpg.Connection | None = None
+        self.pool: asyncpg.Pool | None = None
+        # notifications are handed to one dispatcher task to keep their order
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.dispatcher: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self.pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=4)
+        await self._connect_listener()
+        self.dispatcher = asyncio.create_task(self._dispatch())
+
+    async def close(self) -> None:
+        # clear pool first so a termination callback does not try to reconnect
+        pool, self.pool = self.pool, None
+        if self.dispatcher is not None:
+            self.dispatcher.cancel()
+            self.dispatcher = None
+        if self.listener is not None:
+            await self.listener.close()
+            self.listener = None
+        if pool is not None:
+            await pool.close()
+
+    async def subscribe(self, channel: str, handler: Handler) -> None:
+        self.handlers[channel] = handler
+        await self._sync(channel)
+
+    async def unsubscribe(self, channel: str) -> None:
+        self.handlers.pop(channel, None)
+        await self._sync(channel)
+
+    async def publish(self, channel: str, message: str) -> None:
+        try:
+            await self.pool.execute("SELECT pg_notify($1, $2)", channel, message)
+        except asyncpg.PostgresError:
+            logger.exception("Could not publish to %s", channel)
+
+    async def _sync(self, channel: str) -> None:
+        # subscribe/unsubscribe may interleave, so converge on the wanted state
+        async with self.lock:
+            wanted = channel in self.handlers
+            if wanted and channel not in self.listening:
+                await self.listener.add_listener(channel, self._notify)
+                self.listening.add(channel)
+            elif not wanted and channel in self.listening:
+                await self.listener.remove_listener(channel, self._notify)
+                self.listening.discard(channel)
+
+    async def _connect_listener(self) -> None:
+        self.listener = await asyncpg.connect(self.dsn)
+        self.listener.add_termination_listener(self._lost)
+
+    def _lost(self, connection: asyncpg.Connection) -> None:
+        logger.warning("Broker connection lost, reconnecting")
+        asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = 0.5
+        while self.pool is not None:
+            try:
+                async with self.lock:
+                    await self._connect_listener()
+                    self.listening.clear()
+                    for channel in list(self.handlers):
+                        await self.listener.add_listener(channel, self._notify)
+                        self.listening.add(channel)
+                return
+            except (OSError, asyncpg.PostgresError):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 10)
+
+    def _notify(self, connection, pid, channel: str, payload: str) -> None:
+        self.inbox.put_nowait((channel, payload))
+
+    async def _dispatch(self) -> None:
+        while True:
+            channel, payload = await self.inbox.get()
+            handler = self.handlers.get(channel)
+            if handler is None:
+                continue
+            try:
+                await handler(payload)
+            except Exception:
+                logger.exception("Handler for %s failed", channel)
+
+
+def create_broker(url: str | None) -> Broker:
+    if url and url.startswith(("postgres://", "postgresql://")):
+        return PostgresBroker(url)
+    return InMemoryBroker()
@@ -4,6 +4,41 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
 
     DATABASE_URL: str
+    # read-only replica for GET endpoints, unset sends everything to the primary
+    DATABASE_REPLICA_URL: str | None = None
+    # after a user commits, their reads stay on the primary this long
+    READ_YOUR_WRITES_SECONDS: float = 5
+
+    # connections per worker process: size them against the number of workers
+    # and max_connections, /api/metrics/db shows how often checkouts wait
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    # seconds before a connection is replaced, -1 keeps them forever
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # prepared statements asyncpg keeps per connection; 0 behind pgbouncer
+    # in transaction pooling mode
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # aborts any single statement running longer than this, unset disables it
+    DB_STATEMENT_TIMEOUT_MS: int | None = None
+    # statements slower than this are logged normalized, unset disables it
+    SLOW_QUERY_MS: int | None = 200
+    # per-request DB time in a Server-Timing header (visible in browser devtools)
+    SERVER_TIMING_ENABLED: bool = True
+    # encode feed and chat payloads with orjson and skip the response_model
+    # check on them, see app/responses.py
+    FAST_JSON_RESPONSES: bool = False
+    # Cache-Control sent with the ETag of the feed, profile and replies routes;
+    # no-cache lets clients keep a response but revalidate it on every use
+    CACHE_CONTROL: dict[str, str] = {
+        "feed": "private, no-cache",
+        "profile": "private, no-cache",
+        "replies": "no-cache",
+    }
+    # version tokens not replaced for this long are renewed, which bounds how
+    # long a lost broker message can leave a worker answering 304
+    ETAG_VERSION_TTL_SECONDS: int = 300
 
     JWT_ALGORITHM: str
     JWT_SECRET: str
@@ -15,6 +50,45 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: str
     AWS_BUCKET_NAME: str
     AWS_REGION: str
+    # point at a local S3 stand-in (MinIO, moto) in development
+    AWS_ENDPOINT_URL: str | None = None
+    S3_MAX_CONCURRENT_UPLOADS: int = 8
+    MAX_IMAGE_SIZE: int = 10 * 1024 * 1024
+
+    BACKGROUND_WORKERS: int = 2
+    # processes that resize uploaded images into their responsive variants
+    IMAGE_WORKERS: int = 2
+
+    # postgresql:// DSN to relay websocket messages between workers with
+    # LISTEN/NOTIFY; unset keeps them inside a single process
+    BROKER_URL: str | None = None
+
+    # messages buffered per websocket before the client is disconnected
+    WS_SEND_QUEUE_SIZE: int = 100
+    # feed events kept per worker for clients resuming after a reconnect
+    WS_FEED_HISTORY_SIZE: int = 1000
+
+    # bcrypt runs in a bounded pool ("thread" or "process"); requests beyond
+    # workers + queue size are rejected with 503
+    PASSWORD_HASH_EXECUTOR: str = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_SIZE: int = 10000
+
+    # authors with more followers than this are merged into timelines at read time
+    TIMELINE_FANOUT_THRESHOLD: int = 10000
+
+    # friends-of-friends kept per user, rebuilt by a periodic job
+    FOLLOW_RECOMMENDATIONS_SIZE: int = 20
+    FOLLOW_RECOMMENDATIONS_REFRESH_SECONDS: int = 3600
+
+    # collect like_count changes in memory and write them every flush interval,
+    # see app/like_buffer.py for what a crash loses
+    LIKE_BUFFER_ENABLED: bool = False
+    LIKE_BUFFER_FLUSH_MS: int = 200
+
     class Config:
         env_file = ".env"
 
@@ -1,16 +1,165 @@
+import time
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import Computed, event, exc, make_url
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from .cache import TTLCache
 from .config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False)
 
-async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts block on a full pool."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool, keep counting on that one
+        pool = super().recreate()
+        pool.checkouts, pool.waits = self.checkouts, self.waits
+        pool.wait_seconds = self.wait_seconds
+        pool.max_wait_seconds, pool.timeouts = self.max_wait_seconds, self.timeouts
+        return pool
+
+    def saturated(self) -> bool:
+        # no idle connection and no room to open another: the checkout blocks
+        return (
+            self._pool.empty()
+            and self._max_overflow > -1
+            and self._overflow >= self._max_overflow
+        )
+
+    def _do_get(self):
+        blocked = self.saturated()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.checkouts += 1
+            if blocked:
+                waited = time.perf_counter() - start
+                self.waits += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+def engine_options(url: str) -> dict:
+    backend = make_url(url)
+    if backend.get_backend_name() == "sqlite":
+        return {}
+
+    options = {
+        "poolclass": InstrumentedPool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if backend.get_driver_name() == "asyncpg":
+        server_settings = {}
+        if settings.DB_STATEMENT_TIMEOUT_MS:
+            # set once per connection, so it costs no extra round trip per request
+            server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        options["connect_args"] = {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": server_settings,
+        }
+    return options
+
+
+engine = create_async_engine(
+    settings.DATABASE_URL, echo=False, **engine_options(settings.DATABASE_URL)
+)
+
+if settings.DATABASE_REPLICA_URL:
+    read_engine = create_async_engine(
+        settings.DATABASE_REPLICA_URL,
+        echo=False,
+        **engine_options(settings.DATABASE_REPLICA_URL),
+    )
+else:
+    read_engine = engine
+
+# token subjects that committed on the primary in the last few seconds,
+# see get_read_db in utils
+recent_writers = TTLCache(
+    settings.USER_CACHE_MAX_SIZE, settings.READ_YOUR_WRITES_SECONDS
+)
+
+
+class PrimarySession(Session):
+    """Session on the primary; a commit pins its user's reads to the primary."""
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def remember_writer(session: Session) -> None:
+    subject = session.info.get("subject")
+    if subject:
+        recent_writers.set(subject, True)
+
+
+async_session = sessionmaker(
+    engine,
+    class_=AsyncSession,
+    sync_session_class=PrimarySession,
+    expire_on_commit=False,
+)
+
+read_session = sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
 
 Base = declarative_base()
 
 
+# The search vectors are generated by Postgres full-text functions. On
+# SQLite (development, tests) create_all makes them plain TEXT columns that
+# stay empty, so everything but search works there.
+@compiles(TSVECTOR, "sqlite")
+def tsvector_on_sqlite(type_, compiler, **kw) -> str:
+    return "TEXT"
+
+
+@compiles(Computed, "sqlite")
+def computed_on_sqlite(computed, compiler, **kw) -> str:
+    if isinstance(computed.column.type, TSVECTOR):
+        return ""
+    return compiler.visit_computed_column(computed, **kw)
+
+
+def pool_stats(engine: AsyncEngine) -> dict:
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedPool):
+        return {"pool": type(pool).__name__}
+
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # negative while the pool has not opened pool_size connections yet
+        "overflow": pool.overflow(),
+        "checkouts": pool.checkouts,
+        # checkouts that found the pool exhausted and had to wait for a return
+        "waits": pool.waits,
+        "avg_wait_ms": pool.wait_seconds / pool.waits * 1000 if pool.waits else 0.0,
+        "max_wait_ms": pool.max_wait_seconds * 1000,
+        "timeouts": pool.timeouts,
+    }
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
@@ -1,10 +1,27 @@
-import os, uuid
 from ..models.user import Users
-from ..models.posts import Posts, PostLikes, PostReply
-from ..database import get_db
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from ..models.posts import Posts
+from ..workers import jobs
+from ..aws_utils import upload_image
+from ..images import process_image, srcset
+from ..timeline import backfill_timeline, remove_from_timeline
+from ..recommendations import popular_recommendations, recompute_recommendations
+from ..models.recommendation import FollowRecommendation
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    status,
+    UploadFile,
+    File,
+    Form,
+    Request,
+    Response,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..schemas.post import PostResponse
+from .post import select_feed_posts, serialize_post
+from ..responses import json_response
+from ..etags import PROFILES, not_modified, versions
 from ..schemas.user import (
     UserCreate,
     UserLogin,
@@ -12,8 +29,7 @@ from ..schemas.user import (
     UserProfileUpdate,
     RefreshTokenRequest,
 )
-from sqlalchemy import func
-from sqlalchemy import select, delete, insert
+from sqlalchemy import select, delete, insert, update
 from typing import Annotated, Optional
 from ..utils import (
     hash_user_password,
@@ -21,16 +37,17 @@ from ..utils import (
     create_refresh_token,
     check_password,
     verify_refresh_token,
+    CurrentUser,
     get_current_user,
+    get_db,
+    get_read_db,
+    token_claims,
+    invalidate_user,
 )
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
-UPLOAD_FOLDER = "uploads/images"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-
 @router.post("/register", status_code=status.HTTP_201_CREATED)
 async def register_user(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
 
@@ -43,7 +60,7 @@ async def register_user(user_in: UserCreate, db: AsyncSession = Depends(get_db))
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User with this email already exists",
         )
-    hashed_password = hash_user_password(user_in.password)
+    hashed_password = await hash_user_password(user_in.password)
 
     new_user = Users(
         first_name=user_in.first_name,
@@ -55,8 +72,8 @@ async def register_user(user_in: UserCreate, db: AsyncSession = Depends(get_db))
     db.add(new_user)
     await db.commit()
 
-    access_token = create_access_token({"data": new_user.email})
-    refresh_token = create_refresh_token({"data": new_user.email})
+    access_token = create_access_token(token_claims(new_user))
+    refresh_token = create_refresh_token(token_claims(new_user))
 
     return {
         "access_token": access_token,
@@ -74,9 +91,9 @@ async def login(user_in: UserLogin, db: AsyncSession = Depends(get_db)):
 
     user = result.scalars().first()
 
-    if user and check_password(user_in.password, user.hashed_password):
-        access_token = create_access_token({"data": user.email})
-        refresh_token = create_refresh_token({"data": user.email})
+    if user and await check_password(user_in.password, user.hashed_password):
+        access_token = create_access_token(token_claims(user))
+        refresh_token = create_refresh_token(token_claims(user))
         return {
             "access_token": access_token,
             "refresh_token": refresh_token,
@@ -87,9 +104,9 @@ async def login(user_in: UserLogin, db: AsyncSession = Depends(get_db)):
 
 @router.post("/refresh", status_code=status.HTTP_201_CREATED)
 async def generate_access_token(token: RefreshTokenRequest):
-    email = await verify_refresh_token(token.refresh_token)
-    access_token = create_access_token({"data": email})
-    refresh_token = create_refresh_token({"data": email})
+    claims = await verify_refresh_token(token.refresh_token)
+    access_token = create_access_token(claims)
+    refresh_token = create_refresh_token(claims)
 
     return {
         "access_token": access_token,
@@ -100,127 +117,113 @@ async def generate_access_token(token: RefreshTokenRequest):
 
 @router.get("/me", status_code=status.HTTP_200_OK, response_model=UserProfileReponse)
 async def get_user_profile(
-    user: Annotated[Users, Depends(get_current_user)],
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    response: Response,
+    user: Annotated[CurrentUser, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_read_db),
 ):
-    post_count = await db.scalar(
-        select(func.count(Posts.id)).filter(Posts.user_id == user.id)
-    )
-
-    followers_table = Users.following.property.secondary
-    followers = await db.scalar(
-        select(func.count()).where(followers_table.c.followee_id == user.id)
-    )
-
-    followees = await db.scalar(
-        select(func.count()).where(followers_table.c.follower_id == user.id)
-    )
+    # read the counters fresh, the user from the cache may be a few seconds old
+    result = await db.execute(select(Users).where(Users.id == user.id))
+    user = result.scalars().one()
 
-    return {
+    profile = {
         "id": str(user.id),
         "first_name": user.first_name,
         "last_name": user.last_name,
         "email": user.email,
         "image_path": user.image_path,
-        "post_count": post_count,
-        "followers": followers,
-        "following": followees,
+        "image_srcset": srcset(user.image_variants),
+        "post_count": user.post_count,
+        "followers": user.follower_count,
+        "following": user.following_count,
     }
+    # the lookup is a primary key read, the ETag only saves sending it again
+    return not_modified(request, response, "profile", profile) or profile
 
 
 @router.get(
     "/user/posts", status_code=status.HTTP_200_OK, response_model=list[PostResponse]
 )
 async def get_users_posts(
-    user: Annotated[Users, Depends(get_current_user)],  # TO DO: add pagination here
-    db: AsyncSession = Depends(get_db),
+    # TO DO: add pagination here
+    user: Annotated[CurrentUser, Depends(get_current_user)],
+    db: AsyncSession = Depends(get_read_db),
 ):
-    like_count = (
-        select(func.count(PostLikes.id))
-        .where(PostLikes.post_id == Posts.id)
-        .correlate(Posts)
-    )
-    is_liked = (
-        select(func.count(PostLikes.id))
-        .where(PostLikes.post_id == Posts.id, PostLikes.user_id == user.id)
-        .correlate(Posts)
-    )
-
-    reply_count = (
-        select(func.count(PostReply.id))
-        .where(PostReply.post_id == Posts.id)
-        .correlate(Posts)
+    query = (
+        select_feed_posts(user.id)
+        .where(Posts.user_id == user.id)
+        .order_by(Posts.created_at.desc())
     )
-    query = select(
-        Posts,
-        like_count.label("like_count"),
-        is_liked.label("is_liked"),
-        reply_count.label("reply_count"),
-    ).where(Posts.user_id == user.id)
 
     result = await db.execute(query)
 
-    posts = result.all()
-
-    response = []
-    for post, likes_count, is_liked, reply_count in posts:
-
-        response.append(
-            {
-                "id": str(post.id),
-                "text": post.text,
-                "created_at": post.created_at.isoformat(),
-                "likes_count": likes_count,
-                "is_liked": is_liked,
-                "image_path": post.image_path,
-                "reply_count": reply_count or 0,
-                "user": {
-                    "first_name": post.user.first_name,
-                    "last_name": post.user.last_name,
-                },
-            }
-        )
-    return response
-
-    return posts
+    return json_response(
+        [serialize_post(post, is_liked) for post, is_liked in result.all()]
+    )
 
 
 @router.post("/me/update", status_code=status.HTTP_200_OK)
 async def update_user_profile(
-    user: Annotated[Users, Depends(get_current_user)],
+    user: Annotated[CurrentUser, Depends(get_current_user)],
     first_name: Optional[str] = Form(None),
     last_name: Optional[str] = Form(None),
     profile_picture: Optional[UploadFile] = File(None),
     db: AsyncSession = Depends(get_db),
 ):
+    # the dependency hands out a cached copy, change the row itself
+    user = await db.get(Users, user.id)
+
     if first_name is not None:
         user.first_name = first_name
     if last_name is not None:
         user.last_name = last_name
 
+    image_changed = False
     if profile_picture:
-        extension = profile_picture.filename.split(".")[-1].lower()
-        unique_id = str(uuid.uuid4())
-        filename = f"{unique_id}.{extension}"
-        filepath = f"{UPLOAD_FOLDER}/{filename}"
-
-        async with aiofiles.open(filepath, "wb") as f:
-            content = await profile_picture.read()
-            await f.write(content)
-
-        user.image_path = filepath
+        image_path = await upload_image(profile_picture, prefix="avatars")
+        image_changed = image_path != user.image_path
+        if image_changed:
+            user.image_path = image_path
+            user.image_variants = None
 
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    invalidate_user(user)
+    # names show up in the feed and replies, avatars in the replies
+    await versions.bump(PROFILES)
+
+    if image_changed:
+        jobs.enqueue(process_avatar, user)
 
     return {"msg": "Updated"}
 
 
+async def process_avatar(user: Users) -> None:
+    await process_image(Users, user.id)
+    # cached snapshots still carry the old (empty) variants
+    invalidate_user(user)
+
+
+async def update_follow_counts(
+    db: AsyncSession, follower_id, followee_id, delta: int
+) -> None:
+    await db.execute(
+        update(Users)
+        .where(Users.id == follower_id)
+        .values(following_count=Users.following_count + delta)
+    )
+    await db.execute(
+        update(Users)
+        .where(Users.id == followee_id)
+        .values(follower_count=Users.follower_count + delta)
+    )
+
+
 @router.post("/follow/{id}")
 async def follow(
     id: str,
-    user: Annotated[Users, Depends(get_current_user)],
+    user: Annotated[CurrentUser, Depends(get_current_user)],
     db: AsyncSession = Depends(get_db),
 ) -> dict:
 
@@ -245,13 +248,18 @@ async def follow(
     is_following = result.first()
 
     if is_following:
-        await db.execute(
+        result = await db.execute(
             delete(followers_table).where(
                 followers_table.c.followee_id == user_to_follow.id,
                 followers_table.c.follower_id == user.id,
             )
         )
+        # a concurrent unfollow may have removed the row already
+        if result.rowcount:
+            await update_follow_counts(db, user.id, user_to_follow.id, -1)
+        await db.execute(remove_from_timeline(user.id, user_to_follow.id))
         await db.commit()
+        jobs.enqueue(recompute_recommendations, user.id)
         return {"msg": "Unfollowed"}
 
     await db.execute(
@@ -260,7 +268,11 @@ async def follow(
             followee_id=user_to_follow.id,
         )
     )
+    await update_follow_counts(db, user.id, user_to_follow.id, 1)
     await db.commit()
+
+    jobs.enqueue(backfill_timeline, user.id, user_to_follow.id)
+    jobs.enqueue(recompute_recommendations, user.id)
     return {"msg": "Followed"}
 
 
@@ -269,37 +281,39 @@ async def follow(
     status_code=status.HTTP_200_OK,
 )
 async def user_to_follow(
-    db: AsyncSession = Depends(get_db),
-    user: Users = Depends(get_current_user),  # change the recommandation system
+    db: AsyncSession = Depends(get_read_db),
+    user: CurrentUser = Depends(get_current_user),
 ):
-
-    followers_table = Users.following.property.secondary
-
-    F = followers_table.alias()
-
+    # precomputed by app.recommendations, already-followed users are excluded;
+    # without friends of friends the most followed users are suggested
     query = await db.execute(
         select(
             Users.id,
             Users.first_name,
             Users.last_name,
             Users.image_path,
-            func.count(F.c.follower_id).label("is_following"),
+            FollowRecommendation.score,
         )
-        .where(Users.id != user.id)
-        .outerjoin(F, (F.c.follower_id == user.id) & (F.c.followee_id == Users.id))
-        .group_by(Users.id)
+        .join(FollowRecommendation, FollowRecommendation.candidate_id == Users.id)
+        .where(FollowRecommendation.user_id == user.id)
+        .order_by(FollowRecommendation.score.desc(), FollowRecommendation.candidate_id)
     )
 
     result = query.mappings().all()
+    if not result:
+        result = [
+            {**row, "score": 0} for row in await popular_recommendations(db, user.id)
+        ]
     users = []
     for row in result:
         users.append(
             {
-                "id": row.id,
-                "first_name": row.first_name,
-                "last_name": row.last_name,
-                "image_path": row.image_path,
-                "is_following": bool(row.is_following),  # True if already followed
+                "id": row["id"],
+                "first_name": row["first_name"],
+                "last_name": row["last_name"],
+                "image_path": row["image_path"],
+                "mutual_count": row["score"],
+                "is_following": False,
             }
         )
 
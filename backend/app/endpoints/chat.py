@@ -1,25 +1,41 @@
-from ..database import get_db
 from ..websocket import manager
 from ..models.messages import Chat, Message
 from ..models.user import Users
-from sqlalchemy import and_, or_, select, desc
+from sqlalchemy import and_, or_, select, desc, case, tuple_
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.utils import get_current_user
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, HTTPException
-from pydantic import BaseModel
+from app.utils import CurrentUser, get_current_user, get_db, get_read_db
+from ..pagination import encode_cursor, decode_cursor
+from ..responses import json_response
+from fastapi import (
+    APIRouter,
+    Depends,
+    WebSocket,
+    WebSocketDisconnect,
+    HTTPException,
+    Query,
+)
+from pydantic import BaseModel, Field
+from typing import Optional
 from uuid import UUID
 import json
 
 
 router = APIRouter(prefix="/chat")
 
+MESSAGES_PAGE_SIZE = 50
+MAX_MESSAGES_PAGE_SIZE = 200
+# keeps the new_message event under the 8000 byte NOTIFY payload limit of
+# the Postgres broker: at most 6 bytes per character once JSON encoded
+MAX_MESSAGE_LENGTH = 1000
+
 
 class CreateChatRequest(BaseModel):
     recipient_id: UUID
 
 
 class SendMessageRequest(BaseModel):
-    content: str
+    content: str = Field(min_length=1, max_length=MAX_MESSAGE_LENGTH)
 
 
 # Helper function to serialize user data
@@ -54,31 +70,22 @@ async def get_user_chat(chat_id: UUID, user_id: UUID, db: AsyncSession) -> Chat:
 # List of chats with the last message
 @router.get("/")
 async def get_user_chats(
-    user: Users = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
+    other_user_id = case((Chat.user1_id == user.id, Chat.user2_id), else_=Chat.user1_id)
+    OtherUser = aliased(Users)
+
     result = await db.execute(
-        select(Chat)
+        select(Chat, OtherUser, Message)
+        .outerjoin(OtherUser, OtherUser.id == other_user_id)
+        .outerjoin(Message, Message.id == Chat.last_message_id)
         .where(or_(Chat.user1_id == user.id, Chat.user2_id == user.id))
-        .order_by(desc(Chat.created_at))
+        .order_by(Chat.last_message_at.desc().nulls_last(), desc(Chat.created_at))
     )
-    chats = result.scalars().all()
 
     chat_list = []
-    for chat in chats:
-        other_user_id = chat.user2_id if chat.user1_id == user.id else chat.user1_id
-
-        user_result = await db.execute(select(Users).where(Users.id == other_user_id))
-        other_user = user_result.scalars().first()
-
-        msg_result = await db.execute(
-            select(Message)
-            .where(Message.chat_id == chat.id)
-            .order_by(desc(Message.created_at))
-            .limit(1)
-        )
-        last_message = msg_result.scalars().first()
-
+    for chat, other_user, last_message in result.all():
         chat_list.append(
             {
                 "id": str(chat.id),
@@ -96,13 +103,13 @@ async def get_user_chats(
             }
         )
 
-    return chat_list
+    return json_response(chat_list)
 
 
 @router.post("/create")
 async def create_or_get_chat(
     request: CreateChatRequest,
-    user: Users = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(
@@ -136,44 +143,79 @@ async def create_or_get_chat(
 @router.get("/{chat_id}/messages")
 async def get_chat_messages(
     chat_id: UUID,
-    user: Users = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(MESSAGES_PAGE_SIZE, ge=1, le=MAX_MESSAGES_PAGE_SIZE),
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
+    if before and after:
+        raise HTTPException(
+            status_code=400, detail="Use either before or after, not both"
+        )
+
     chat = await get_user_chat(chat_id, user.id, db)
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
 
-    result = await db.execute(
-        select(Message)
-        .where(and_(Message.chat_id == chat_id, Message.is_deleted == False))
-        .order_by(Message.created_at)
+    query = select(Message).where(
+        and_(Message.chat_id == chat_id, Message.is_deleted == False)
     )
+    position = tuple_(Message.created_at, Message.id)
+
+    # without a cursor we return the latest page; pages are always sent oldest first
+    if after:
+        query = query.where(position > tuple_(*decode_cursor(after))).order_by(
+            Message.created_at, Message.id
+        )
+    else:
+        if before:
+            query = query.where(position < tuple_(*decode_cursor(before)))
+        query = query.order_by(Message.created_at.desc(), Message.id.desc())
+
+    result = await db.execute(query.limit(limit + 1))
     messages = result.scalars().all()
 
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if not after:
+        messages.reverse()
+
+    # both participants in one query instead of one lookup per message
+    result = await db.execute(
+        select(Users).where(Users.id.in_([chat.user1_id, chat.user2_id]))
+    )
+    participants = {participant.id: participant for participant in result.scalars()}
+
     message_list = []
     for msg in messages:
-        sender_result = await db.execute(select(Users).where(Users.id == msg.sender_id))
-        sender = sender_result.scalars().first()
-
         message_list.append(
             {
                 "id": str(msg.id),
                 "content": msg.content,
                 "sender_id": str(msg.sender_id),
-                "sender": serialize_user(sender),
+                "sender": serialize_user(participants.get(msg.sender_id)),
                 "created_at": msg.created_at.isoformat() if msg.created_at else None,
                 "is_own": msg.sender_id == user.id,
             }
         )
 
-    return message_list
+    older = None
+    newer = after
+    if messages:
+        if after or has_more:
+            older = encode_cursor(messages[0].created_at, messages[0].id)
+        newer = encode_cursor(messages[-1].created_at, messages[-1].id)
+
+    # pass "before" back to load older history, "after" to catch up on new messages
+    return json_response({"messages": message_list, "before": older, "after": newer})
 
 
 @router.post("/{chat_id}/messages")
 async def send_message(
     chat_id: UUID,
     request: SendMessageRequest,
-    user: Users = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     chat = await get_user_chat(chat_id, user.id, db)
@@ -182,6 +224,10 @@ async def send_message(
 
     message = Message(chat_id=chat_id, sender_id=user.id, content=request.content)
     db.add(message)
+    await db.flush()
+
+    chat.last_message_id = message.id
+    chat.last_message_at = message.created_at
     await db.commit()
     await db.refresh(message)
 
@@ -198,7 +244,9 @@ async def send_message(
                     "created_at": message.created_at.isoformat(),
                     "is_own": False,
                 },
-            }
+            },
+            # \uXXXX escapes would take up to 12 bytes per character
+            ensure_ascii=False,
         ),
     )
 
@@ -217,7 +265,7 @@ async def websocket_chat(websocket: WebSocket, chat_id: str):
 
     try:
         while True:
-            data = await websocket.receive_text()
+            data = await manager.receive_text(websocket)
     except WebSocketDisconnect:
         await manager.disconnect_chat(chat_id, websocket)
 
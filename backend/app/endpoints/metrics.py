@@ -0,0 +1,51 @@
+import os
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    generate_latest,
+    multiprocess,
+)
+
+from ..database import engine, read_engine, pool_stats, recent_writers
+from ..etags import versions
+from ..like_buffer import like_buffer
+from ..utils import user_cache
+from ..websocket import manager
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+# scraped by Prometheus at /metrics, outside the /api prefix
+prometheus_router = APIRouter()
+
+
+# numbers are per worker process, query each worker to see the whole picture
+@router.get("/db")
+async def db_metrics():
+    metrics = {"primary": pool_stats(engine)}
+    if read_engine is not engine:
+        metrics["replica"] = pool_stats(read_engine)
+        metrics["pinned_to_primary"] = len(recent_writers.data)
+    return metrics
+
+
+@router.get("/cache")
+async def cache_metrics():
+    return {
+        "user_cache": user_cache.stats(),
+        "like_buffer": like_buffer.stats(),
+        "websocket": manager.stats(),
+        "etag_versions": versions.stats(),
+    }
+
+
+@prometheus_router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # several worker processes: aggregate the files they all write to
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
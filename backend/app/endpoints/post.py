@@ -1,20 +1,47 @@
-import json,os, aiofiles
+import json,os, aiofiles, mimetypes
+from uuid import UUID, uuid4
 
 from ..models.user import Users
 from ..models.posts import Posts, PostLikes, PostReply, ReplyLike
-from ..database import get_db
+from ..models.timeline import TimelineEntry
+from ..database import read_session
 from ..websocket import manager
-from ..schemas.post import PostResponse
+from ..workers import jobs
+from ..timeline import fan_out_post, celebrity_followees
+from ..images import process_image, srcset
+from ..likes import set_like
+from ..like_buffer import like_buffer
+from ..schemas.post import (
+    PostResponse,
+    PostPage,
+    ImageUploadRequest,
+    FinalizePostRequest,
+)
+from ..pagination import encode_cursor, decode_cursor
+from ..responses import json_response
+from ..etags import FEED, PROFILES, REPLY_LIKES, not_modified, versions
 
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy.future import select
-from sqlalchemy import and_, func
-from app.utils import get_current_user
-from io import BytesIO
+from sqlalchemy import exists, func, tuple_, union, update
+from sqlalchemy.exc import IntegrityError
+from app.utils import (
+    CurrentUser,
+    get_current_user,
+    get_db,
+    get_read_db,
+    get_websocket_user,
+)
 from app.config import settings
-from app.aws_utils import storage, BUCKET
+from app.aws_utils import (
+    IMAGE_CONTENT_TYPES,
+    upload_image,
+    presign_image_upload,
+    stat_object,
+    object_url,
+)
 from fastapi import (
     APIRouter,
     Depends,
@@ -23,6 +50,9 @@ from fastapi import (
     UploadFile,
     File,
     Form,
+    Query,
+    Request,
+    Response,
     WebSocket,
     WebSocketDisconnect,
 )
@@ -33,94 +63,204 @@ UPLOAD_FOLDER = "uploads/images"
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+UPLOADS_PREFIX = "uploads"
 
-async def get_post_from_db(user_id: str, db: AsyncSession):
-    sub_query_for_like = (
-        select(func.count(PostLikes.id))
-        .where(PostLikes.post_id == Posts.id)
-        .correlate(Posts)
-    )
-    sub_query_is_liked = (
-        select(func.count(PostLikes.id))
+FEED_PAGE_SIZE = 20
+MAX_FEED_PAGE_SIZE = 100
+
+
+def select_feed_posts(user_id: str):
+    is_liked = (
+        exists()
         .where(PostLikes.post_id == Posts.id, PostLikes.user_id == user_id)
         .correlate(Posts)
     )
 
-    sub_query_for_reply = (
-        select(func.count(PostReply.id))
-        .where(PostReply.post_id == Posts.id)
-        .correlate(Posts)
+    return select(Posts, is_liked.label("is_liked")).options(selectinload(Posts.user))
+
+
+def serialize_post(post: Posts, is_liked: bool, author=None) -> dict:
+    # author stands in for post.user when that is not loaded
+    author = author or post.user
+    return {
+        "id": str(post.id),
+        "text": post.text,
+        "created_at": post.created_at.isoformat(),
+        "likes_count": post.like_count + like_buffer.pending_delta(Posts, post.id),
+        "is_liked": bool(is_liked),
+        "image_path": post.image_path,
+        "image_srcset": srcset(post.image_variants),
+        "reply_count": post.reply_count,
+        "user": {
+            "first_name": author.first_name,
+            "last_name": author.last_name,
+        },
+    }
+
+
+def build_feed_page(posts: list, limit: int) -> dict:
+    # one extra row tells us whether there is a next page
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        last = posts[-1][0]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    response = [serialize_post(post, is_liked) for post, is_liked in posts]
+    return {"items": response, "next_cursor": next_cursor}
+
+
+async def get_post_from_db(
+    user_id: str,
+    db: AsyncSession,
+    before: Optional[str] = None,
+    limit: int = FEED_PAGE_SIZE,
+):
+    query = (
+        select_feed_posts(user_id)
+        .order_by(Posts.created_at.desc(), Posts.id.desc())
+        .limit(limit + 1)
     )
 
-    query = (
-        select(
-            Posts,
-            sub_query_for_like.label("like_count"),
-            sub_query_is_liked.label("is_liked"),
-            sub_query_for_reply.label("reply_count"),
+    if before:
+        created_at, post_id = decode_cursor(before)
+        query = query.where(
+            tuple_(Posts.created_at, Posts.id) < tuple_(created_at, post_id)
         )
-        .order_by(Posts.created_at.desc())
-        .options(selectinload(Posts.user))
-    )
 
     result = await db.execute(query)
-    posts = result.all()
+    return build_feed_page(result.all(), limit)
 
-    response = []
-    for post, likes_count, is_liked, reply_count in posts:
 
-        response.append(
-            {
-                "id": str(post.id),
-                "text": post.text,
-                "created_at": post.created_at.isoformat(),
-                "likes_count": likes_count,
-                "is_liked": is_liked,
-                "image_path": post.image_path,
-                "reply_count": reply_count or 0,
-                "user": {
-                    "first_name": post.user.first_name,
-                    "last_name": post.user.last_name,
-                },
-            }
+async def get_timeline_from_db(
+    user_id: str,
+    db: AsyncSession,
+    before: Optional[str] = None,
+    limit: int = FEED_PAGE_SIZE,
+):
+    # fanned-out posts come from the user's own timeline rows,
+    # posts of followed celebrities are merged in at read time
+    entries = select(TimelineEntry.post_id, TimelineEntry.created_at).where(
+        TimelineEntry.user_id == user_id
+    )
+    celebrity_posts = select(Posts.id.label("post_id"), Posts.created_at).where(
+        Posts.user_id.in_(celebrity_followees(user_id))
+    )
+
+    if before:
+        created_at, post_id = decode_cursor(before)
+        entries = entries.where(
+            tuple_(TimelineEntry.created_at, TimelineEntry.post_id)
+            < tuple_(created_at, post_id)
+        )
+        celebrity_posts = celebrity_posts.where(
+            tuple_(Posts.created_at, Posts.id) < tuple_(created_at, post_id)
         )
-    return response
+
+    entries = (
+        entries.order_by(TimelineEntry.created_at.desc(), TimelineEntry.post_id.desc())
+        .limit(limit + 1)
+        .subquery()
+    )
+    celebrity_posts = (
+        celebrity_posts.order_by(Posts.created_at.desc(), Posts.id.desc())
+        .limit(limit + 1)
+        .subquery()
+    )
+    page = union(
+        select(entries.c.post_id), select(celebrity_posts.c.post_id)
+    ).subquery()
+
+    query = (
+        select_feed_posts(user_id)
+        .join(page, page.c.post_id == Posts.id)
+        .order_by(Posts.created_at.desc(), Posts.id.desc())
+        .limit(limit + 1)
+    )
+
+    result = await db.execute(query)
+    return build_feed_page(result.all(), limit)
 
 
-@router.get("/", response_model=list[PostResponse])
+@router.get("/", response_model=PostPage)
 async def get_all_posts(
-    user: Users = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+    request: Request,
+    response: Response,
+    before: Optional[str] = None,
+    limit: int = Query(FEED_PAGE_SIZE, ge=1, le=MAX_FEED_PAGE_SIZE),
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    posts = await get_post_from_db(str(user.id), db)
+    # is_liked makes the page per user
+    stamp = versions.stamp(FEED, PROFILES)
+    cached = not_modified(request, response, "feed", stamp, user.id, before, limit)
+    if cached:
+        return cached
 
-    return posts
+    posts = await get_post_from_db(str(user.id), db, before, limit)
 
+    return json_response(posts, response)
 
-@router.get("/{id}", status_code=status.HTTP_200_OK)
-async def get_post_by_id(id: str, db: AsyncSession = Depends(get_db)):
 
-    like_count = (
-        select(func.count(ReplyLike.id))
-        .where(ReplyLike.reply_id == PostReply.id)
-        .correlate(PostReply)
+@router.get("/timeline", response_model=PostPage)
+async def get_home_timeline(
+    before: Optional[str] = None,
+    limit: int = Query(FEED_PAGE_SIZE, ge=1, le=MAX_FEED_PAGE_SIZE),
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    posts = await get_timeline_from_db(str(user.id), db, before, limit)
+
+    return json_response(posts)
+
+
+def select_replies_stamp(post_id: str):
+    """Count and newest created_at of a post's replies and of their likes.
+
+    An added row moves the newest created_at and a removed one lowers the
+    count, so any change to either set changes the stamp; only a row added
+    and removed again leaves it as it was.
+    """
+    replies = PostReply.post_id == post_id
+    likes = ReplyLike.reply_id.in_(select(PostReply.id).where(replies))
+    return select(
+        select(func.count()).select_from(PostReply).where(replies).scalar_subquery(),
+        select(func.max(PostReply.created_at)).where(replies).scalar_subquery(),
+        select(func.count()).select_from(ReplyLike).where(likes).scalar_subquery(),
+        select(func.max(ReplyLike.created_at)).where(likes).scalar_subquery(),
     )
 
+
+@router.get("/{id}", status_code=status.HTTP_200_OK)
+async def get_post_by_id(
+    id: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+):
+    result = await db.execute(select_replies_stamp(id))
+    stamp = versions.stamp(PROFILES, REPLY_LIKES)
+    cached = not_modified(request, response, "replies", stamp, tuple(result.one()))
+    if cached:
+        return cached
+
     query = (
-        select(PostReply, like_count.label("like_count"))
+        select(PostReply)
         .where(PostReply.post_id == id)
         .options(selectinload(PostReply.user))
     )
     result = await db.execute(query)
-    replies = result.all()
-    response = []
+    replies = result.scalars().all()
+    reply_list = []
 
-    for reply, like_count in replies:
-        response.append(
+    for reply in replies:
+        reply_list.append(
             {
                 "id": str(reply.id),
                 "reply": reply.reply,
                 "created_at": reply.created_at,
-                "like_count": like_count,
+                "like_count": reply.like_count
+                + like_buffer.pending_delta(PostReply, reply.id),
                 "user": {
                     "id": reply.user.id,
                     "first_name": reply.user.first_name,
@@ -130,29 +270,133 @@ async def get_post_by_id(id: str, db: AsyncSession = Depends(get_db)):
             }
         )
 
-    return response
+    return json_response(reply_list, response)
+
+
+def parse_feed_message(data: str) -> dict:
+    """A client frame with limit clamped and before checked, or ValueError."""
+    message = json.loads(data)
+    if not isinstance(message, dict):
+        raise ValueError("Expected a JSON object")
+
+    try:
+        limit = int(message.get("limit") or FEED_PAGE_SIZE)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be a number")
+    message["limit"] = max(1, min(limit, MAX_FEED_PAGE_SIZE))
+
+    before = message.get("before")
+    if before is not None:
+        try:
+            decode_cursor(before)
+        except (HTTPException, TypeError, AttributeError):
+            raise ValueError("Invalid cursor")
+    return message
 
 
 @router.websocket("/ws")
 async def get_posts(
     websocket: WebSocket,
-    user: Users = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = None,
+    user: CurrentUser = Depends(get_websocket_user),
 ):
-
+    """Feed updates pushed as they happen.
+
+    On connect the client gets {"type": "snapshot"} with the first feed page,
+    then delta events: post_created, post_deleted and post_counts. Every
+    event carries a cursor; reconnecting with ?cursor=<last seen> replays
+    what was missed instead of sending a new snapshot, when this worker
+    still has it. {"type": "posts", "before": ...} pages further back; a
+    malformed frame is answered with {"type": "error", "detail": ...}.
+    """
     await manager.connect(websocket)
 
     try:
+        if cursor is None or not manager.can_resume(cursor):
+            # events published while the snapshot loads are replayed after it
+            cursor = manager.feed_cursor()
+            async with read_session() as db:
+                page = await get_post_from_db(str(user.id), db)
+            await manager.send_json(
+                websocket,
+                {
+                    "type": "snapshot",
+                    "data": page["items"],
+                    "next_cursor": page["next_cursor"],
+                    "cursor": cursor,
+                },
+            )
+        await manager.join_feed(websocket, cursor)
+
         while True:
-            data = await websocket.receive_text()
-            message = json.loads(data)
+            data = await manager.receive_text(websocket)
+            try:
+                message = parse_feed_message(data)
+            except ValueError as error:
+                # a bad frame is the client's problem, keep the feed running
+                await manager.send_json(
+                    websocket, {"type": "error", "detail": str(error)}
+                )
+                continue
             if message.get("type") == "posts":
-                posts = await get_post_from_db(str(user.id), db)
-                await websocket.send_json({"type": "posts", "data": posts})
+                async with read_session() as db:
+                    page = await get_post_from_db(
+                        str(user.id), db, message.get("before"), message["limit"]
+                    )
+                await manager.send_json(
+                    websocket,
+                    {
+                        "type": "posts",
+                        "data": page["items"],
+                        "next_cursor": page["next_cursor"],
+                    },
+                )
     except WebSocketDisconnect:
         await manager.disconnect(websocket)
 
 
+async def publish_feed_event(event: dict) -> None:
+    """Push a feed change to the websockets and move the feed ETag."""
+    await manager.broadcast(event)
+    await versions.bump(FEED)
+
+
+async def publish_counts(post_id, **counts) -> None:
+    await publish_feed_event({"type": "post_counts", "id": str(post_id), **counts})
+
+
+async def process_post_image(post_id) -> None:
+    await process_image(Posts, post_id)
+    # the feed now has the srcset of the image
+    await versions.bump(FEED)
+
+
+async def save_post(
+    db: AsyncSession,
+    user: CurrentUser,
+    text: Optional[str],
+    image_path: Optional[str],
+    upload_key: Optional[str] = None,
+) -> Posts:
+    new_post = Posts(
+        text=text, image_path=image_path, upload_key=upload_key, user_id=user.id
+    )
+    db.add(new_post)
+    await db.execute(
+        update(Users).where(Users.id == user.id).values(post_count=Users.post_count + 1)
+    )
+    await db.commit()
+
+    jobs.enqueue(fan_out_post, new_post.id, user.id, new_post.created_at)
+    if image_path:
+        jobs.enqueue(process_post_image, new_post.id)
+
+    await publish_feed_event(
+        {"type": "post_created", "post": serialize_post(new_post, False, user)}
+    )
+    return new_post
+
+
 @router.post("/create", status_code=status.HTTP_201_CREATED)
 async def create_post(
     text: Optional[str] = Form(None, max_length=1000),
@@ -164,26 +408,77 @@ async def create_post(
 
     upload_path = None
 
-    content = await image.read()
-    storage.upload_fileobj(
-        Fileobj=BytesIO(content),
-        Bucket=BUCKET,
-        Key=f"images/{image.filename}",
-        ExtraArgs={"ContentType": image.content_type},
-    )
+    if image:
+        upload_path = await upload_image(image)
 
-    upload_path = f"https://{BUCKET}.s3.amazonaws.com/images/{image.filename}"
+    await save_post(db, user, text, upload_path)
 
-    new_post = Posts(text=text, image_path=upload_path, user_id=user.id)
-    db.add(new_post)
-    await db.commit()
+    return {"msg": "Post Created"}
+
+
+@router.post("/uploads", status_code=status.HTTP_201_CREATED)
+async def create_image_upload(
+    request: ImageUploadRequest, user: CurrentUser = Depends(get_current_user)
+):
+    if request.content_type not in IMAGE_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported image type"
+        )
+    if request.size > settings.MAX_IMAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Image is too large",
+        )
+
+    extension = mimetypes.guess_extension(request.content_type) or ""
+    key = f"{UPLOADS_PREFIX}/{user.id}/{uuid4().hex}{extension}"
+    upload = presign_image_upload(key, request.content_type)
+
+    # the client POSTs the file to url with fields, then calls /create/finalize
+    return {"key": key, "url": upload["url"], "fields": upload["fields"]}
+
+
+@router.post("/create/finalize", status_code=status.HTTP_201_CREATED)
+async def finalize_post(
+    request: FinalizePostRequest,
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    if not request.key.startswith(f"{UPLOADS_PREFIX}/{user.id}/"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Unauthorized"
+        )
+
+    head = await stat_object(request.key)
+    if head is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Upload not found"
+        )
+    if (
+        head["ContentLength"] > settings.MAX_IMAGE_SIZE
+        or head.get("ContentType") not in IMAGE_CONTENT_TYPES
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image upload"
+        )
+
+    try:
+        await save_post(db, user, request.text, object_url(request.key), request.key)
+    except IntegrityError:
+        # a retried or replayed finalize for an upload that already has its post
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Upload already used"
+        )
 
     return {"msg": "Post Created"}
 
 
 @router.delete("/delete/{id}", status_code=status.HTTP_200_OK)
 async def delete_post(
-    id: str, user: Users = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+    id: str,
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
 
     result = await db.execute(select(Posts).where(Posts.id == id))
@@ -193,46 +488,89 @@ async def delete_post(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST)
 
     await db.delete(post)
+    await db.execute(
+        update(Users)
+        .where(Users.id == post.user_id)
+        .values(post_count=Users.post_count - 1)
+    )
     await db.commit()
+
+    await publish_feed_event({"type": "post_deleted", "id": str(post.id)})
     return {"msg": "deleted"}
 
 
+async def like_or_404(db: AsyncSession, model, user_id, id, liked: bool) -> dict:
+    changed, like_count = await set_like(db, model, user_id, id, liked)
+    if like_count is None:
+        detail = "Post not found" if model is Posts else "Reply not found"
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+    if changed and model is Posts:
+        await publish_counts(id, likes_count=like_count)
+    return {"liked": liked, "like_count": like_count}
+
+
+@router.put("/{id}/like", status_code=status.HTTP_200_OK)
+async def like_post(
+    id: UUID,
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    return await like_or_404(db, Posts, user.id, id, True)
+
+
+@router.delete("/{id}/like", status_code=status.HTTP_200_OK)
+async def unlike_post(
+    id: UUID,
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    return await like_or_404(db, Posts, user.id, id, False)
+
+
+@router.put("/reply/{id}/like", status_code=status.HTTP_200_OK)
+async def like_reply(
+    id: UUID,
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    return await like_or_404(db, PostReply, user.id, id, True)
+
+
+@router.delete("/reply/{id}/like", status_code=status.HTTP_200_OK)
+async def unlike_reply(
+    id: UUID,
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    return await like_or_404(db, PostReply, user.id, id, False)
+
+
+# toggles kept for older clients, PUT/DELETE .../like state the intent instead
 @router.post("/create_delete_like/{id}/", status_code=status.HTTP_200_OK)
 async def post_like(
-    id: str, user: Users = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+    id: UUID,
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(select(Posts).where(Posts.id == id))
-    post = result.scalars().first()
-
-    if not post:
+    unliked, like_count = await set_like(db, Posts, user.id, id, False)
+    if like_count is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Post not found"
         )
-
-    result = await db.execute(
-        select(PostLikes).where(
-            and_(PostLikes.user_id == user.id, PostLikes.post_id == post.id)
-        )
-    )
-
-    like = result.scalar_one_or_none()
-    if like:
-        await db.delete(like)
-        await db.commit()
+    if unliked:
+        await publish_counts(id, likes_count=like_count)
         return {"msg": "Dislike"}
 
-    new_like = PostLikes(user_id=user.id, post_id=post.id)
-
-    db.add(new_like)
-    await db.commit()
-
+    liked, like_count = await set_like(db, Posts, user.id, id, True)
+    if liked:
+        await publish_counts(id, likes_count=like_count)
     return {"msg": "Like"}
 
 
 @router.post("/{id}/reply/", status_code=status.HTTP_201_CREATED)
 async def reply_to_post(
     id: str,
-    user: Users = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
     text: str = Form(..., max_length=1000),
     db: AsyncSession = Depends(get_db),
 ):
@@ -247,14 +585,22 @@ async def reply_to_post(
 
     reply = PostReply(reply=text, post_id=post.id, user_id=user.id)
     db.add(reply)
+    reply_count = await db.scalar(
+        update(Posts)
+        .where(Posts.id == post.id)
+        .values(reply_count=Posts.reply_count + 1)
+        .returning(Posts.reply_count)
+    )
     await db.commit()
+
+    await publish_counts(post.id, reply_count=reply_count)
     return {"msg": "Reply created"}
 
 
 @router.delete("/reply/{reply_id}/", status_code=status.HTTP_200_OK)
 async def delete_reply(
     reply_id: str,
-    user: Users = Depends(get_current_user),
+    user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(select(PostReply).where(PostReply.id == reply_id))
@@ -271,37 +617,31 @@ async def delete_reply(
         )
 
     await db.delete(reply)
+    reply_count = await db.scalar(
+        update(Posts)
+        .where(Posts.id == reply.post_id)
+        .values(reply_count=Posts.reply_count - 1)
+        .returning(Posts.reply_count)
+    )
     await db.commit()
+
+    await publish_counts(reply.post_id, reply_count=reply_count)
     return {"msg": "Reply deleted"}
 
 
 @router.post("/reply/{id}/create-delete-like/")
 async def like_dislike_reply(
-    id: str, user: Users = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+    id: UUID,
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(select(PostReply).where(PostReply.id == id))
-
-    reply = result.scalars().first()
-
-    if not reply:
+    unliked, like_count = await set_like(db, PostReply, user.id, id, False)
+    if like_count is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Replt not found"
         )
-
-    result = await db.execute(
-        select(ReplyLike).where(
-            and_(ReplyLike.reply_id == id, ReplyLike.user_id == user.id)
-        )
-    )
-
-    like = result.scalars().first()
-
-    if like:
-        await db.delete(like)
-        await db.commit()
+    if unliked:
         return {"message": "Like deleted"}
 
-    new_like = ReplyLike(user_id=user.id, reply_id=reply.id)
-    db.add(new_like)
-    await db.commit()
+    await set_like(db, PostReply, user.id, id, True)
     return {"msg": "Liked"}
@@ -0,0 +1,133 @@
+import re
+from typing import Annotated, Literal, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from ..images import srcset
+from ..like_buffer import like_buffer
+from ..models.posts import Posts, PostReply
+from ..models.user import Users
+from ..pagination import encode_rank_cursor, decode_rank_cursor
+from ..utils import CurrentUser, get_current_user, get_read_db
+from .post import select_feed_posts, serialize_post
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 50
+
+
+def text_query(q: str):
+    # accepts anything a user types: quotes, "or", -exclusions
+    return func.websearch_to_tsquery("english", q)
+
+
+def name_query(q: str):
+    # "ali sm" -> ali:* & sm:*, so names match while they are being typed
+    words = re.findall(r"\w+", q.lower())
+    return func.to_tsquery("simple", " & ".join(f"{word}:*" for word in words))
+
+
+def ranked(query, vector, tsquery, id_column, cursor: Optional[str], limit: int):
+    """Matches of tsquery through the GIN index on vector, best first.
+
+    Keyset pagination on (rank, id): the cursor is the last row's pair.
+    """
+    rank = func.ts_rank_cd(vector, tsquery)
+    query = (
+        query.add_columns(rank.label("rank"))
+        .where(vector.bool_op("@@")(tsquery))
+        .order_by(rank.desc(), id_column.desc())
+        .limit(limit + 1)
+    )
+
+    if cursor:
+        last_rank, last_id = decode_rank_cursor(cursor)
+        query = query.where(tuple_(rank, id_column) < tuple_(last_rank, last_id))
+
+    return query
+
+
+def search_posts_query(user_id, q: str, cursor: Optional[str], limit: int):
+    return ranked(
+        select_feed_posts(user_id),
+        Posts.search_vector,
+        text_query(q),
+        Posts.id,
+        cursor,
+        limit,
+    )
+
+
+def search_replies_query(q: str, cursor: Optional[str], limit: int):
+    return ranked(
+        select(PostReply).options(selectinload(PostReply.user)),
+        PostReply.search_vector,
+        text_query(q),
+        PostReply.id,
+        cursor,
+        limit,
+    )
+
+
+def search_users_query(q: str, cursor: Optional[str], limit: int):
+    return ranked(
+        select(Users), Users.search_vector, name_query(q), Users.id, cursor, limit
+    )
+
+
+def serialize_reply(reply: PostReply) -> dict:
+    return {
+        "id": str(reply.id),
+        "reply": reply.reply,
+        "post_id": str(reply.post_id),
+        "created_at": reply.created_at.isoformat(),
+        "like_count": reply.like_count + like_buffer.pending_delta(PostReply, reply.id),
+        "user": {
+            "first_name": reply.user.first_name,
+            "last_name": reply.user.last_name,
+            "image_path": reply.user.image_path,
+        },
+    }
+
+
+def serialize_user(user: Users) -> dict:
+    return {
+        "id": str(user.id),
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "image_path": user.image_path,
+        "image_srcset": srcset(user.image_variants),
+    }
+
+
+def build_search_page(rows: list, limit: int, serialize) -> dict:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_rank_cursor(last.rank, last[0].id)
+
+    return {"items": [serialize(*row[:-1]) for row in rows], "next_cursor": next_cursor}
+
+
+@router.get("")
+async def search(
+    user: Annotated[CurrentUser, Depends(get_current_user)],
+    q: str = Query(min_length=1, max_length=200),
+    type: Literal["posts", "replies", "users"] = "posts",
+    cursor: Optional[str] = None,
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if type == "posts":
+        query, serialize = search_posts_query(user.id, q, cursor, limit), serialize_post
+    elif type == "replies":
+        query, serialize = search_replies_query(q, cursor, limit), serialize_reply
+    else:
+        query, serialize = search_users_query(q, cursor, limit), serialize_user
+
+    result = await db.execute(query)
+    return build_search_page(result.all(), limit, serialize)
@@ -0,0 +1,184 @@
+"""ETags and 304 Not Modified for the feed, profile and reply endpoints.
+
+An ETag is a hash of a cheap version stamp taken before the response is
+built, so a matching If-None-Match is answered without running the full
+query or serializing anything:
+
+  - feed: tokens in `versions`, replaced on every change to the posts it
+    shows (new/deleted posts, like and reply counts, processed images,
+    author names), plus the user and the page parameters.
+  - replies: count and newest created_at of the post's replies and of their
+    likes in one statement, plus tokens for author names and buffered
+    like counts.
+  - profile: the profile itself after its primary key lookup; this one
+    only saves the transfer.
+
+A stamp read before the data can only be older than it, never newer, so a
+client may get a 200 it did not need but never a 304 for a change it has
+not seen. Bumped tokens go through the broker, so from the first change on
+every worker answers with the same ETag. While a replica is configured a
+freshly bumped token is withheld for READ_YOUR_WRITES_SECONDS, until the
+replica has the change.
+"""
+
+import hashlib, json, time
+from uuid import uuid4
+
+from fastapi import Request, Response, status
+
+from .broker import Broker
+from .config import settings
+from .websocket import manager
+
+VERSIONS_CHANNEL = "versions"
+
+FEED = "feed"
+PROFILES = "profiles"
+# only bumped by like buffer flushes, reply likes are stamped from their rows
+REPLY_LIKES = "reply_likes"
+
+# (time_ns, worker, seq), compared as a tuple
+Version = tuple[int, str, int]
+
+
+class ResourceVersions:
+    """Per-worker version token for each resource key, synced via the broker.
+
+    Versions are (time_ns, worker, seq) and only move forward: a broker
+    message that is not newer than the current version (a late or
+    reordered one) is ignored instead of rolling the worker back to an
+    older token. A bump is always newer than every version the bumping
+    worker has seen, so changes that follow each other win in order on
+    every worker; concurrent bumps rely on the workers' clocks agreeing
+    (NTP), the ttl bounds the damage when they do not.
+
+    A token that was not replaced for ETAG_VERSION_TTL_SECONDS is renewed
+    locally, which bounds how long a lost broker message can leave a worker
+    answering 304 with an outdated token.
+    """
+
+    def __init__(self, broker: Broker, ttl: float, settle: float) -> None:
+        self.broker = broker
+        self.ttl = ttl
+        self.settle = settle
+        self.worker = uuid4().hex[:8]
+        self.seq = 0
+        # key -> (version, set at, usable from)
+        self.tokens: dict[str, tuple[Version, float, float]] = {}
+        self.bumps = 0
+        self.received = 0
+        self.stale = 0
+        self.expired = 0
+
+    async def start(self) -> None:
+        await self.broker.subscribe(VERSIONS_CHANNEL, self._receive)
+
+    async def bump(self, key: str) -> None:
+        """Call after committing a change to `key`."""
+        version = self._next(key)
+        # this worker switches right away, the others when the message arrives
+        self._set(key, version)
+        self.bumps += 1
+        await self.broker.publish(
+            VERSIONS_CHANNEL, json.dumps({"key": key, "version": version})
+        )
+
+    def stamp(self, *keys: str) -> str | None:
+        """The current tokens of keys, None while one of them is settling."""
+        now = time.monotonic()
+        tokens = []
+        for key in keys:
+            version, set_at, settled_at = self.tokens.get(key, (None, 0.0, 0.0))
+            if version is None or now - set_at > self.ttl:
+                if version is not None:
+                    self.expired += 1
+                # nothing changed, the replica needs no time to catch up
+                version, set_at, settled_at = self._set(
+                    key, self._next(key), settle=False
+                )
+            if now < settled_at:
+                return None
+            tokens.append("-".join(str(part) for part in version))
+        return ":".join(tokens)
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self.tokens),
+            "bumps": self.bumps,
+            "received": self.received,
+            "stale": self.stale,
+            "expired": self.expired,
+        }
+
+    def _next(self, key: str) -> Version:
+        self.seq += 1
+        current = self.tokens.get(key)
+        clock = time.time_ns()
+        if current is not None:
+            clock = max(clock, current[0][0] + 1)
+        return (clock, self.worker, self.seq)
+
+    def _set(self, key: str, version: Version, settle: bool = True) -> tuple:
+        now = time.monotonic()
+        self.tokens[key] = (version, now, now + self.settle if settle else 0.0)
+        return self.tokens[key]
+
+    async def _receive(self, message: str) -> None:
+        data = json.loads(message)
+        version = tuple(data["version"])
+        current = self.tokens.get(data["key"])
+        # our own bumps come back too, they are already set
+        if current is not None and version <= current[0]:
+            if version != current[0]:
+                self.stale += 1
+            return
+        self.received += 1
+        self._set(data["key"], version)
+
+
+versions = ResourceVersions(
+    manager.broker,
+    settings.ETAG_VERSION_TTL_SECONDS,
+    settings.READ_YOUR_WRITES_SECONDS if settings.DATABASE_REPLICA_URL else 0,
+)
+
+
+def etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    # weak: orjson and the stdlib encoder order the same document differently
+    return f'W/"{digest}"'
+
+
+def matches(if_none_match: str | None, tag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, W/ prefixes do not matter
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return tag.removeprefix("W/") in (
+        candidate.removeprefix("W/") for candidate in candidates
+    )
+
+
+def not_modified(
+    request: Request, response: Response, route: str, stamp, *parts
+) -> Response | None:
+    """A 304 when the client has the ETag of stamp and parts, else None after
+    adding that ETag and the route's Cache-Control to response. Without a
+    stamp (a token still settling) no ETag is sent and the request is served
+    normally.
+    """
+    if stamp is None:
+        return None
+
+    tag = etag(route, stamp, *parts)
+    headers = {
+        "ETag": tag,
+        "Cache-Control": settings.CACHE_CONTROL.get(route, "no-cache"),
+        "Vary": "Authorization",
+    }
+    if matches(request.headers.get("if-none-match"), tag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
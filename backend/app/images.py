@@ -0,0 +1,124 @@
+import asyncio, io, os
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+from sqlalchemy import select, update
+
+from .aws_utils import BUCKET, storage, store_object, key_from_url, object_url
+from .config import settings
+from .database import async_session
+
+VARIANT_WIDTHS = (160, 320, 640, 1080)
+
+# name -> (Pillow format, content type)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+VARIANT_QUALITY = 80
+
+# decoding allocates width * height * 4 bytes up front, so a small file
+# claiming huge dimensions is refused before it is decoded
+MAX_IMAGE_PIXELS = 40_000_000
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+image_executor: ProcessPoolExecutor | None = None
+
+
+def render_variants(data: bytes) -> list[tuple[str, int, bytes]]:
+    """Decode once and encode every (format, width) variant.
+
+    Runs in a worker process. Re-encoding without passing exif/icc data
+    strips the metadata; the EXIF orientation is applied first so the
+    pixels stay upright without it. WebP keeps transparency, JPEG gets
+    transparent areas on white. Raises Image.DecompressionBombError for
+    images over MAX_IMAGE_PIXELS.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        # Pillow itself only warns below twice its limit
+        if original.width * original.height > MAX_IMAGE_PIXELS:
+            raise Image.DecompressionBombError(
+                f"{original.width}x{original.height} exceeds {MAX_IMAGE_PIXELS} pixels"
+            )
+        image = ImageOps.exif_transpose(original)
+        transparent = image.has_transparency_data
+        image = image.convert("RGBA" if transparent else "RGB")
+
+    # never upscale, the original width stands in for the larger ones
+    widths = sorted({min(width, image.width) for width in VARIANT_WIDTHS}, reverse=True)
+
+    variants = []
+    for width in widths:
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+
+        for name, (image_format, _) in VARIANT_FORMATS.items():
+            output = image
+            if transparent and image_format == "JPEG":
+                output = Image.new("RGB", image.size, "white")
+                output.paste(image, mask=image.getchannel("A"))
+            buffer = io.BytesIO()
+            output.save(buffer, format=image_format, quality=VARIANT_QUALITY)
+            variants.append((name, width, buffer.getvalue()))
+
+    return variants
+
+
+def srcset(variants: dict | None) -> dict[str, str] | None:
+    """{"webp": {"320": url}} -> {"webp": "url 320w, ..."} for <img srcset>."""
+    if not variants:
+        return None
+    return {
+        name: ", ".join(
+            f"{url} {width}w"
+            for width, url in sorted(urls.items(), key=lambda item: int(item[0]))
+        )
+        for name, urls in variants.items()
+    }
+
+
+def _executor() -> ProcessPoolExecutor:
+    global image_executor
+    if image_executor is None:
+        image_executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return image_executor
+
+
+def shutdown_executor() -> None:
+    global image_executor
+    if image_executor is not None:
+        image_executor.shutdown(cancel_futures=True)
+        image_executor = None
+
+
+async def process_image(model, row_id) -> None:
+    """Background job: build the responsive variants of model.image_path."""
+    async with async_session() as db:
+        source_url = await db.scalar(select(model.image_path).where(model.id == row_id))
+
+    key = key_from_url(source_url) if source_url else None
+    if key is None:
+        return
+
+    response = await asyncio.to_thread(storage.get_object, Bucket=BUCKET, Key=key)
+    data = await asyncio.to_thread(response["Body"].read)
+
+    loop = asyncio.get_running_loop()
+    rendered = await loop.run_in_executor(_executor(), render_variants, data)
+
+    stem = os.path.splitext(key)[0]
+    variants: dict[str, dict[str, str]] = {}
+    for name, width, content in rendered:
+        variant_key = f"variants/{stem}/{width}.{name}"
+        await store_object(content, variant_key, VARIANT_FORMATS[name][1])
+        variants.setdefault(name, {})[str(width)] = object_url(variant_key)
+
+    async with async_session() as db:
+        # skip if the image was replaced while we were rendering
+        await db.execute(
+            update(model)
+            .where(model.id == row_id, model.image_path == source_url)
+            .values(image_variants=variants)
+        )
+        await db.commit()
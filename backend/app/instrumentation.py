@@ -0,0 +1,154 @@
+"""Per-request SQL statistics.
+
+Cursor events count statements, DB time and rows into the RequestStats of
+the request being served (a contextvar, so background jobs are not
+attributed to whichever request happened to be running). The middleware
+turns them into Prometheus histograms per route and a Server-Timing header.
+"""
+
+import logging, re, time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .config import settings
+
+slow_query_logger = logging.getLogger("app.slow_queries")
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to the response start, per route",
+    ["method", "route", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed while serving a request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 200),
+)
+REQUEST_DB_TIME = Histogram(
+    "db_time_per_request_seconds",
+    "Time spent waiting on SQL statements while serving a request",
+    ["method", "route"],
+)
+REQUEST_ROWS = Histogram(
+    "db_rows_per_request",
+    "Rows returned or affected by the statements of a request",
+    ["method", "route"],
+    buckets=(0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000),
+)
+
+
+@dataclass
+class RequestStats:
+    scope: dict
+    queries: int = 0
+    db_seconds: float = 0.0
+    rows: int = 0
+
+    @property
+    def route(self) -> str:
+        # the route template, not the path, keeps the label set bounded;
+        # the router adds it to the scope once a route matched
+        return getattr(self.scope.get("route"), "path", "unmatched")
+
+
+current_stats: ContextVar[RequestStats | None] = ContextVar(
+    "current_stats", default=None
+)
+
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_placeholder_lists = re.compile(r"\((?:\s*(?:\$\d+|\?|%\(\w+\)s)\s*,?)+\)")
+
+
+def normalize_statement(statement: str) -> str:
+    """One line, literals replaced by ? and IN lists collapsed, to group by."""
+    statement = _literals.sub("?", " ".join(statement.split()))
+    return _placeholder_lists.sub("(...)", statement)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # kept on the execution context, a failed statement leaves nothing behind
+    context.query_start = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context.query_start
+
+    stats = current_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        # asyncpg reports the rows of SELECTs too, from the command status;
+        # -1 (SQLite SELECTs) counts as none
+        stats.rows += max(context.rowcount, 0)
+
+    if settings.SLOW_QUERY_MS is not None and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        slow_query_logger.warning(
+            "%.1f ms in %s: %s",
+            elapsed * 1000,
+            stats.route if stats else "background",
+            normalize_statement(statement),
+        )
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware recording RequestStats for every HTTP request."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(scope)
+        token = current_stats.set(stats)
+        start = time.perf_counter()
+        recorded = False
+
+        async def send_with_timing(message):
+            nonlocal recorded
+            if message["type"] == "http.response.start":
+                recorded = True
+                self.record(stats, message["status"], start)
+                if settings.SERVER_TIMING_ENABLED:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", self.server_timing(stats, start))
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            # an exception escaped before the response started; the 500 is
+            # sent further out, by Starlette's ServerErrorMiddleware
+            if not recorded:
+                self.record(stats, 500, start)
+            current_stats.reset(token)
+
+    @staticmethod
+    def record(stats: RequestStats, status: int, start: float) -> None:
+        labels = (stats.scope["method"], stats.route)
+        REQUEST_LATENCY.labels(*labels, str(status)).observe(
+            time.perf_counter() - start
+        )
+        REQUEST_QUERIES.labels(*labels).observe(stats.queries)
+        REQUEST_DB_TIME.labels(*labels).observe(stats.db_seconds)
+        REQUEST_ROWS.labels(*labels).observe(stats.rows)
+
+    @staticmethod
+    def server_timing(stats: RequestStats, start: float) -> bytes:
+        total_ms = (time.perf_counter() - start) * 1000
+        return (
+            f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+            f"app;dur={total_ms:.1f}"
+        ).encode()
@@ -0,0 +1,153 @@
+"""Write-behind buffer for like_count.
+
+With LIKE_BUFFER_ENABLED the like rows are still written by the request,
+but the like_count bump is collected here per post/reply and applied every
+LIKE_BUFFER_FLUSH_MS in one UPDATE per table. A viral post then costs one
+row update per interval instead of one per like, and likes stop queueing
+on that row's lock.
+
+Reads add pending_delta() to the stored count, so a worker always answers with
+the count including its own unflushed likes. Other workers see them once
+they are flushed, up to one interval later.
+
+Crash semantics: deltas live only in process memory.
+  - Clean shutdown (lifespan exit) flushes whatever is pending.
+  - A failed flush puts its deltas back and retries on the next tick.
+  - A killed process loses at most the last interval (plus any failed
+    flushes) of counter updates. The like rows themselves are committed
+    before the request returns, so nothing a user did is lost, only the
+    denormalized counts drift; python -m app.reconcile recounts them.
+"""
+
+import asyncio, logging
+from collections import defaultdict
+from uuid import UUID
+
+from sqlalchemy import Integer, Uuid, column, update, values
+
+from .config import settings
+from .database import async_session
+from .etags import FEED, REPLY_LIKES, versions
+from .models.posts import Posts, PostReply
+
+logger = logging.getLogger(__name__)
+
+Deltas = dict[type, defaultdict[UUID, int]]
+
+
+def _empty() -> Deltas:
+    return {Posts: defaultdict(int), PostReply: defaultdict(int)}
+
+
+def flush_statement(model, deltas: dict[UUID, int]):
+    """UPDATE model SET like_count = like_count + delta FROM (VALUES ...)."""
+    rows = values(column("id", Uuid), column("delta", Integer), name="deltas").data(
+        # a fixed order keeps concurrent flushes from deadlocking on the rows
+        sorted(deltas.items())
+    )
+    return (
+        update(model)
+        .where(model.id == rows.c.id)
+        .values(like_count=model.like_count + rows.c.delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+class LikeBuffer:
+    """Per-process like_count deltas, flushed by a background task."""
+
+    def __init__(self, enabled: bool, interval: float) -> None:
+        self.enabled = enabled
+        self.interval = interval
+        self.pending: Deltas = _empty()
+        # taken out of pending by a flush that has not committed yet
+        self.flushing: Deltas = _empty()
+        self.task: asyncio.Task | None = None
+        self.lock = asyncio.Lock()
+        self.flushed = 0
+        self.failed_flushes = 0
+
+    def add(self, model, target_id: UUID, delta: int) -> None:
+        self.pending[model][target_id] += delta
+
+    def pending_delta(self, model, target_id: UUID) -> int:
+        if not self.enabled:
+            return 0
+        return self.pending[model].get(target_id, 0) + self.flushing[model].get(
+            target_id, 0
+        )
+
+    async def flush(self) -> None:
+        async with self.lock:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        self.flushing, self.pending = self.pending, _empty()
+        batches = {
+            model: {key: delta for key, delta in deltas.items() if delta}
+            for model, deltas in self.flushing.items()
+        }
+        if not any(batches.values()):
+            self.flushing = _empty()
+            return
+
+        committed = False
+        try:
+            async with async_session() as db:
+                for model, deltas in batches.items():
+                    if deltas:
+                        await db.execute(flush_statement(model, deltas))
+                await db.commit()
+                # the stored counts include the deltas now; closing the session
+                # awaits, and reads meanwhile must not add them a second time
+                self.flushing = _empty()
+                committed = True
+        except Exception:
+            if committed:
+                logger.exception("Like buffer session failed to close")
+            else:
+                self.failed_flushes += 1
+                logger.exception("Like buffer flush failed, retrying next interval")
+                for model, deltas in batches.items():
+                    for key, delta in deltas.items():
+                        self.pending[model][key] += delta
+                self.flushing = _empty()
+                return
+
+        self.flushed += sum(len(deltas) for deltas in batches.values())
+        # other workers' responses now include these likes
+        if batches[Posts]:
+            await versions.bump(FEED)
+        if batches[PostReply]:
+            await versions.bump(REPLY_LIKES)
+
+    async def start(self) -> None:
+        if self.enabled:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            # stop() cancelling us must not drop a batch halfway through
+            await asyncio.shield(self.flush())
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending": sum(len(deltas) for deltas in self.pending.values()),
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+like_buffer = LikeBuffer(
+    settings.LIKE_BUFFER_ENABLED, settings.LIKE_BUFFER_FLUSH_MS / 1000
+)
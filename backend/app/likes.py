@@ -0,0 +1,93 @@
+from uuid import UUID, uuid4
+from sqlalchemy import select, update, delete, exists, func, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models.posts import Posts, PostLikes, PostReply, ReplyLike
+from .like_buffer import like_buffer
+
+# liked model -> (like model, like column pointing at it)
+LIKES = {
+    Posts: (PostLikes, PostLikes.post_id),
+    PostReply: (ReplyLike, ReplyLike.reply_id),
+}
+
+
+def _with_count(model, changed, target_id: UUID, delta: int):
+    """Bump like_count by the rows `changed` touched, in the same statement.
+
+    The outer SELECT sees the snapshot from before the CTEs ran, so when
+    nothing changed the stored count is read instead. delta=0 leaves the
+    count to the like buffer.
+    """
+    stored = select(model.like_count).where(model.id == target_id).scalar_subquery()
+    if not delta:
+        return select(
+            exists(select(changed.c.target_id)).label("changed"),
+            stored.label("like_count"),
+        )
+
+    bumped = (
+        update(model)
+        .where(model.id.in_(select(changed.c.target_id)))
+        .values(like_count=model.like_count + delta)
+        .returning(model.like_count)
+        .cte("bumped")
+    )
+    return select(
+        exists(select(bumped.c.like_count)).label("changed"),
+        func.coalesce(select(bumped.c.like_count).scalar_subquery(), stored).label(
+            "like_count"
+        ),
+    )
+
+
+def like_statement(model, user_id: UUID, target_id: UUID, buffered: bool = False):
+    like, column = LIKES[model]
+    new_like = select(
+        literal(uuid4(), like.id.type),
+        literal(user_id, like.user_id.type),
+        model.id,
+    ).where(model.id == target_id)
+
+    inserted = (
+        insert(like)
+        .from_select(["id", "user_id", column.key], new_like)
+        .on_conflict_do_nothing(index_elements=["user_id", column.key])
+        .returning(column.label("target_id"))
+        .cte("changed")
+    )
+    return _with_count(model, inserted, target_id, 0 if buffered else 1)
+
+
+def unlike_statement(model, user_id: UUID, target_id: UUID, buffered: bool = False):
+    like, column = LIKES[model]
+    deleted = (
+        delete(like)
+        .where(like.user_id == user_id, column == target_id)
+        .returning(column.label("target_id"))
+        .cte("changed")
+    )
+    return _with_count(model, deleted, target_id, 0 if buffered else -1)
+
+
+async def set_like(
+    db: AsyncSession, model, user_id: UUID, target_id: UUID, liked: bool
+) -> tuple[bool, int | None]:
+    """Like or unlike in one round trip, returns (changed, like_count).
+
+    Idempotent: the unique (user_id, target) constraint makes a repeated or
+    concurrent like a no-op. like_count is None when the target is missing.
+    """
+    buffered = like_buffer.enabled
+    statement = (like_statement if liked else unlike_statement)(
+        model, user_id, target_id, buffered
+    )
+    row = (await db.execute(statement)).one()
+    await db.commit()
+
+    if row.like_count is None:
+        return False, None
+    if buffered and row.changed:
+        like_buffer.add(model, target_id, 1 if liked else -1)
+    return row.changed, row.like_count + like_buffer.pending_delta(model, target_id)
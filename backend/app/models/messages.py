@@ -11,6 +11,7 @@ from sqlalchemy import (
     UniqueConstraint,
     UUID,
     Text,
+    Index,
 )
 
 
@@ -19,13 +20,28 @@ class Chat(Base):
 
     id = Column(UUID, primary_key=True, default=uuid4)
     is_private = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.now())
+    created_at = Column(DateTime, default=datetime.now)
 
     user1_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
     user2_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
 
+    # denormalized by send_message so the inbox needs no per-chat lookups
+    last_message_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey(
+            "messages.id",
+            ondelete="SET NULL",
+            use_alter=True,
+            name="fk_chats_last_message_id",
+        ),
+        nullable=True,
+    )
+    last_message_at = Column(DateTime, nullable=True)
+
     __table_args__ = (
         UniqueConstraint("user1_id", "user2_id", name="unique_private_chat"),
+        Index("ix_chats_user1_last_message_at", user1_id, last_message_at.desc()),
+        Index("ix_chats_user2_last_message_at", user2_id, last_message_at.desc()),
     )
 
 
@@ -37,10 +53,13 @@ class Message(Base):
     sender_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
 
     content = Column(Text)
-    created_at = Column(DateTime, default=datetime.now())
+    created_at = Column(DateTime, default=datetime.now)
 
     is_deleted = Column(Boolean, default=False)
 
+    # history pages: WHERE chat_id = ? ORDER BY created_at, id
+    __table_args__ = (Index("ix_messages_chat_created_at_id", chat_id, created_at, id),)
+
 
 class ChatParticipant(Base):
     __tablename__ = "chat_participants"
@@ -51,3 +70,5 @@ class ChatParticipant(Base):
 
     joined_at = Column(DateTime, default=datetime.now())
     last_read_message_id = Column(UUID(as_uuid=True), nullable=True)
+
+    __table_args__ = (Index("ix_chat_participants_chat_id", chat_id),)
@@ -1,6 +1,19 @@
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from ..database import get_db, Base
-from sqlalchemy import Column, Integer, String, UUID, Text, ForeignKey, DateTime
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    UUID,
+    Text,
+    ForeignKey,
+    DateTime,
+    Index,
+    JSON,
+    Computed,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from uuid import uuid4
 from datetime import datetime
 
@@ -10,8 +23,16 @@ class Posts(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid4)
     text = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.now())
+    created_at = Column(DateTime, default=datetime.now)
     image_path = Column(String, nullable=True)
+    # {"webp": {"320": url, ...}, "jpeg": {...}}, filled in by app.images
+    image_variants = Column(JSON, nullable=True)
+    # presigned upload the image came from; unique so a key makes one post
+    upload_key = Column(String, nullable=True, unique=True)
+
+    # denormalized, kept in sync by the like/reply endpoints
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
+    reply_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
     user = relationship("Users", back_populates="posts")
@@ -19,6 +40,23 @@ class Posts(Base):
     likes = relationship("PostLikes", back_populates="post")
     reply = relationship("PostReply", back_populates="post")
 
+    # maintained by Postgres, searched through the GIN index; deferred so
+    # loading a post does not pull the vector along
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed("to_tsvector('english', coalesce(text, ''))", persisted=True),
+        )
+    )
+
+    __table_args__ = (
+        # keyset pagination of the feed: ORDER BY created_at DESC, id DESC
+        Index("ix_posts_created_at_id", created_at.desc(), id.desc()),
+        # a user's posts, newest first
+        Index("ix_posts_user_created_at", user_id, created_at.desc(), id.desc()),
+        Index("ix_posts_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
 
 class PostLikes(Base):
     __tablename__ = "post_likes"
@@ -30,13 +68,20 @@ class PostLikes(Base):
     post_id = Column(UUID(as_uuid=True), ForeignKey("posts.id", ondelete="CASCADE"))
     post = relationship(Posts, back_populates="likes")
 
+    # one like per user and post; also serves the is_liked lookups
+    __table_args__ = (
+        UniqueConstraint("user_id", "post_id", name="uq_post_likes_user_post"),
+        Index("ix_post_likes_post_id", post_id),
+    )
+
 
 class PostReply(Base):
     __tablename__ = "post_replies"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     reply = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=datetime.now())
+    created_at = Column(DateTime, default=datetime.now)
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
     user = relationship("Users", back_populates="replies")
@@ -46,12 +91,21 @@ class PostReply(Base):
 
     reply_like = relationship("ReplyLike", back_populates="reply")
 
+    search_vector = deferred(
+        Column(TSVECTOR, Computed("to_tsvector('english', reply)", persisted=True))
+    )
+
+    __table_args__ = (
+        Index("ix_post_replies_post_created_at", post_id, created_at),
+        Index("ix_post_replies_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
 
 class ReplyLike(Base):
     __tablename__ = "reply_likes"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
-    created_at = Column(DateTime, default=datetime.now())
+    created_at = Column(DateTime, default=datetime.now)
 
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
     user = relationship("Users", back_populates="user_reply_likes")
@@ -60,3 +114,8 @@ class ReplyLike(Base):
         UUID(as_uuid=True), ForeignKey("post_replies.id", ondelete="CASCADE")
     )   
     reply = relationship(PostReply, back_populates="reply_like")
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "reply_id", name="uq_reply_likes_user_reply"),
+        Index("ix_reply_likes_reply_id", reply_id),
+    )
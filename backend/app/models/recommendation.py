@@ -0,0 +1,26 @@
+from ..database import Base
+from sqlalchemy import Column, UUID, ForeignKey, DateTime, Integer, Index
+
+
+class FollowRecommendation(Base):
+    __tablename__ = "follow_recommendations"
+
+    user_id = Column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    candidate_id = Column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    # how many of the people user_id follows already follow candidate_id
+    score = Column(Integer, nullable=False)
+    computed_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_follow_recommendations_user_score",
+            user_id,
+            score.desc(),
+            candidate_id,
+        ),
+    )
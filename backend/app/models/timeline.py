@@ -0,0 +1,28 @@
+from ..database import Base
+from sqlalchemy import Column, UUID, ForeignKey, DateTime, Index
+
+
+class TimelineEntry(Base):
+    __tablename__ = "timeline_entries"
+
+    user_id = Column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    post_id = Column(
+        UUID(as_uuid=True), ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True
+    )
+    author_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
+
+    # copy of Posts.created_at so a page is a single range scan on the index below
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_timeline_entries_user_created",
+            user_id,
+            created_at.desc(),
+            post_id.desc(),
+        ),
+        # unfollow removes one author's entries from a timeline
+        Index("ix_timeline_entries_user_author", user_id, author_id),
+    )
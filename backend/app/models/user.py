@@ -1,7 +1,18 @@
 from ..database import Base
-from sqlalchemy import Column, String, UUID, Table, ForeignKey
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    UUID,
+    Table,
+    ForeignKey,
+    JSON,
+    Computed,
+    Index,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from uuid import uuid4
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 
 
 followers_table = Table(
@@ -9,6 +20,8 @@ followers_table = Table(
     Base.metadata,
     Column("follower_id", ForeignKey("users.id"), primary_key=True),
     Column("followee_id", ForeignKey("users.id"), primary_key=True),
+    # the primary key covers lookups by follower_id only
+    Index("ix_followers_followee_id", "followee_id"),
 )
 
 
@@ -19,9 +32,15 @@ class Users(Base):
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
     image_path = Column(String, nullable=True)
+    image_variants = Column(JSON, nullable=True)
     email = Column(String, unique=True, nullable=False)
     hashed_password = Column(String, nullable=False)
 
+    # denormalized, kept in sync by the follow and post endpoints
+    post_count = Column(Integer, nullable=False, default=0, server_default="0")
+    follower_count = Column(Integer, nullable=False, default=0, server_default="0")
+    following_count = Column(Integer, nullable=False, default=0, server_default="0")
+
     posts = relationship("Posts", back_populates="user")
     likes = relationship("PostLikes", back_populates="user")
     replies = relationship("PostReply", back_populates="user")
@@ -34,3 +53,18 @@ class Users(Base):
         secondaryjoin=id == followers_table.c.followee_id,
         backref="followers",
     )
+
+    # names are not stemmed, searched by prefix for type-ahead
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "to_tsvector('simple', first_name || ' ' || last_name)",
+                persisted=True,
+            ),
+        )
+    )
+
+    __table_args__ = (
+        Index("ix_users_search_vector", "search_vector", postgresql_using="gin"),
+    )
@@ -0,0 +1,39 @@
+import base64, binascii
+from datetime import datetime
+from uuid import UUID
+from fastapi import HTTPException, status
+
+
+# Opaque keyset cursors: "<sort key>,<id>" encoded as urlsafe base64
+def _encode(key: str, id: UUID) -> str:
+    raw = f"{key},{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str, parse_key) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        key, id = raw.rsplit(",", 1)
+        return parse_key(key), UUID(id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    return _encode(created_at.isoformat(), id)
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    return _decode(cursor, datetime.fromisoformat)
+
+
+# search results are ordered by rank; repr() round-trips the float exactly
+def encode_rank_cursor(rank: float, id: UUID) -> str:
+    return _encode(repr(rank), id)
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, UUID]:
+    return _decode(cursor, float)
@@ -0,0 +1,169 @@
+import asyncio
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import select, delete, func, exists, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .cache import TTLCache
+from .config import settings
+from .database import async_session, engine
+from .models.recommendation import FollowRecommendation
+from .models.user import Users, followers_table
+
+# users recomputed per statement by the periodic refresh
+REFRESH_BATCH_SIZE = 500
+
+# pg_advisory_lock key held by whichever worker runs the periodic refresh
+REFRESH_LOCK_KEY = 0x7265636F  # "reco"
+
+# most followed users, ranked once per refresh interval in each worker
+popular_users = TTLCache(1, settings.FOLLOW_RECOMMENDATIONS_REFRESH_SECONDS)
+
+
+def friends_of_friends(user_ids: list[UUID]):
+    """Top candidates for each of user_ids, ranked by mutual follows.
+
+    A candidate is followed by someone the user follows, is not the user
+    and is not followed by them yet.
+    """
+    friend = followers_table.alias("friend")
+    candidate = followers_table.alias("candidate")
+    following = followers_table.alias("following")
+
+    mutuals = (
+        select(
+            friend.c.follower_id.label("user_id"),
+            candidate.c.followee_id.label("candidate_id"),
+            func.count().label("score"),
+        )
+        .join(candidate, candidate.c.follower_id == friend.c.followee_id)
+        .where(
+            friend.c.follower_id.in_(user_ids),
+            candidate.c.followee_id != friend.c.follower_id,
+            ~exists().where(
+                following.c.follower_id == friend.c.follower_id,
+                following.c.followee_id == candidate.c.followee_id,
+            ),
+        )
+        .group_by(friend.c.follower_id, candidate.c.followee_id)
+        .subquery()
+    )
+
+    position = func.row_number().over(
+        partition_by=mutuals.c.user_id,
+        order_by=(mutuals.c.score.desc(), mutuals.c.candidate_id),
+    )
+    ranked = select(mutuals, position.label("position")).subquery()
+
+    return select(ranked.c.user_id, ranked.c.candidate_id, ranked.c.score).where(
+        ranked.c.position <= settings.FOLLOW_RECOMMENDATIONS_SIZE
+    )
+
+
+async def recompute_recommendations(*user_ids: UUID) -> None:
+    recommendations = insert(FollowRecommendation).from_select(
+        ["user_id", "candidate_id", "score", "computed_at"],
+        friends_of_friends(list(user_ids)).add_columns(literal(datetime.now())),
+    )
+
+    async with async_session() as db:
+        # readers keep seeing the old rows until the commit
+        await db.execute(
+            delete(FollowRecommendation).where(
+                FollowRecommendation.user_id.in_(user_ids)
+            )
+        )
+        # a concurrent recompute of the same user (a follow job and the
+        # refresh) may commit its rows after our delete; overwrite them
+        # instead of failing on the primary key
+        await db.execute(
+            recommendations.on_conflict_do_update(
+                index_elements=["user_id", "candidate_id"],
+                set_={
+                    "score": recommendations.excluded.score,
+                    "computed_at": recommendations.excluded.computed_at,
+                },
+            )
+        )
+        await db.commit()
+
+
+async def popular_recommendations(db: AsyncSession, user_id: UUID) -> list[dict]:
+    """Most followed users not followed by user_id yet.
+
+    The fallback for users without friends of friends, e.g. everyone who
+    does not follow anybody yet.
+    """
+    popular = popular_users.get("popular")
+    if popular is None:
+        # scans users, hence cached; leaves room for the ones filtered below
+        result = await db.execute(
+            select(Users.id, Users.first_name, Users.last_name, Users.image_path)
+            .order_by(Users.follower_count.desc(), Users.id)
+            .limit(2 * settings.FOLLOW_RECOMMENDATIONS_SIZE)
+        )
+        popular = [dict(row) for row in result.mappings()]
+        popular_users.set("popular", popular)
+
+    followed = set(
+        await db.scalars(
+            select(followers_table.c.followee_id).where(
+                followers_table.c.follower_id == user_id,
+                followers_table.c.followee_id.in_([row["id"] for row in popular]),
+            )
+        )
+    )
+    candidates = [
+        row for row in popular if row["id"] != user_id and row["id"] not in followed
+    ]
+    return candidates[: settings.FOLLOW_RECOMMENDATIONS_SIZE]
+
+
+async def refresh_recommendations() -> None:
+    """Periodic job: recompute everyone who follows at least one user.
+
+    Every worker schedules it; an advisory lock lets one of them run it
+    while the others skip the round.
+    """
+    async with engine.connect() as connection:
+        postgres = connection.dialect.name == "postgresql"
+        if postgres:
+            locked = await connection.scalar(
+                select(func.pg_try_advisory_lock(REFRESH_LOCK_KEY))
+            )
+            # the lock belongs to the session, do not sit idle in a transaction
+            await connection.commit()
+            if not locked:
+                return
+        try:
+            await refresh_all_recommendations()
+        finally:
+            if postgres:
+                await connection.execute(
+                    select(func.pg_advisory_unlock(REFRESH_LOCK_KEY))
+                )
+                await connection.commit()
+
+
+async def refresh_all_recommendations() -> None:
+    last_id = None
+    while True:
+        query = (
+            select(followers_table.c.follower_id)
+            .distinct()
+            .order_by(followers_table.c.follower_id)
+            .limit(REFRESH_BATCH_SIZE)
+        )
+        if last_id is not None:
+            query = query.where(followers_table.c.follower_id > last_id)
+
+        async with async_session() as db:
+            user_ids = (await db.scalars(query)).all()
+        if not user_ids:
+            return
+
+        await recompute_recommendations(*user_ids)
+        last_id = user_ids[-1]
+        # let the other queued jobs through between batches
+        await asyncio.sleep(0)
@@ -0,0 +1,81 @@
+"""Repair drift in the denormalized counters.
+
+Run with: python -m app.reconcile
+"""
+
+import asyncio
+from sqlalchemy import func, select, update
+
+from .database import async_session
+from .models.posts import Posts, PostLikes, PostReply, ReplyLike
+from .models.user import Users, followers_table
+
+
+def _counter_fixes():
+    post_likes = (
+        select(func.count(PostLikes.id))
+        .where(PostLikes.post_id == Posts.id)
+        .scalar_subquery()
+    )
+    post_replies = (
+        select(func.count(PostReply.id))
+        .where(PostReply.post_id == Posts.id)
+        .scalar_subquery()
+    )
+    reply_likes = (
+        select(func.count(ReplyLike.id))
+        .where(ReplyLike.reply_id == PostReply.id)
+        .scalar_subquery()
+    )
+    user_posts = (
+        select(func.count(Posts.id)).where(Posts.user_id == Users.id).scalar_subquery()
+    )
+    user_followers = (
+        select(func.count())
+        .where(followers_table.c.followee_id == Users.id)
+        .scalar_subquery()
+    )
+    user_following = (
+        select(func.count())
+        .where(followers_table.c.follower_id == Users.id)
+        .scalar_subquery()
+    )
+
+    return {
+        "posts.like_count": update(Posts)
+        .where(Posts.like_count != post_likes)
+        .values(like_count=post_likes),
+        "posts.reply_count": update(Posts)
+        .where(Posts.reply_count != post_replies)
+        .values(reply_count=post_replies),
+        "post_replies.like_count": update(PostReply)
+        .where(PostReply.like_count != reply_likes)
+        .values(like_count=reply_likes),
+        "users.post_count": update(Users)
+        .where(Users.post_count != user_posts)
+        .values(post_count=user_posts),
+        "users.follower_count": update(Users)
+        .where(Users.follower_count != user_followers)
+        .values(follower_count=user_followers),
+        "users.following_count": update(Users)
+        .where(Users.following_count != user_following)
+        .values(following_count=user_following),
+    }
+
+
+async def reconcile_counters() -> dict[str, int]:
+    """Recount every counter from its source table, returns rows fixed per counter."""
+    fixed = {}
+    async with async_session() as db:
+        for name, statement in _counter_fixes().items():
+            result = await db.execute(
+                statement.execution_options(synchronize_session=False)
+            )
+            fixed[name] = result.rowcount
+        await db.commit()
+    return fixed
+
+
+if __name__ == "__main__":
+    for name, count in asyncio.run(reconcile_counters()).items():
+        print(f"{name}: {count} rows fixed")
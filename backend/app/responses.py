@@ -0,0 +1,34 @@
+"""orjson responses for the large read endpoints.
+
+The feed, reply and chat endpoints already build their payloads as plain
+dicts in the response's shape (serialize_post, serialize_message, ...).
+Handed back as-is, FastAPI validates them into the response_model again,
+dumps that to JSON-compatible Python and encodes it with the stdlib json.
+With FAST_JSON_RESPONSES they are returned as an ORJSONResponse instead,
+which FastAPI sends untouched: one pass of orjson, which also encodes
+datetime and UUID values itself. The response_model stays on the route for
+the OpenAPI schema, it is just no longer checked at runtime.
+
+python -m benchmarks.serialization compares the two on a feed page.
+"""
+
+from typing import Any
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+from .config import settings
+
+
+def json_response(content: Any, response: Response | None = None) -> Any:
+    """content, sent as an ORJSONResponse when FAST_JSON_RESPONSES is on.
+
+    Pass the route's injected Response to keep the headers set on it,
+    FastAPI only copies them onto the responses it builds itself.
+    """
+    if settings.FAST_JSON_RESPONSES:
+        fast = ORJSONResponse(content)
+        if response is not None:
+            fast.headers.raw.extend(response.headers.raw)
+        return fast
+    return content
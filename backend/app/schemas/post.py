@@ -1,4 +1,4 @@
-from pydantic import BaseModel, field_serializer
+from pydantic import BaseModel, Field, field_serializer
 from datetime import datetime
 from uuid import UUID
 from typing import Optional
@@ -14,13 +14,31 @@ class PostResponse(BaseModel):
     reply_count: int
     created_at: datetime
     image_path: Optional[str] = None
+    # {"webp": "url 160w, url 320w, ...", "jpeg": ...} once the variants exist
+    image_srcset: Optional[dict[str, str]] = None
 
     model_config = {"from_attributes": True}
 
     @field_serializer("id")
     def serialize_id(self, value: UUID) -> str:
         return str(value)
-    
+
+
+class PostPage(BaseModel):
+    items: list[PostResponse]
+    next_cursor: Optional[str] = None
+
+
+class ImageUploadRequest(BaseModel):
+    content_type: str
+    size: int = Field(gt=0)
+
+
+class FinalizePostRequest(BaseModel):
+    key: str
+    text: Optional[str] = Field(None, max_length=1000)
+
+
 class ReplyResponse(BaseModel):
     id: UUID
     reply: str
@@ -41,6 +41,7 @@ class UserProfileReponse(BaseModel):
     last_name: str
     email: str
     image_path: str | None = None
+    image_srcset: dict[str, str] | None = None
     post_count: int | None = 0
     followers: int | None = 0
     following: int | None = 0
@@ -0,0 +1,109 @@
+from uuid import UUID
+from sqlalchemy import select, delete, literal
+from sqlalchemy.dialects.postgresql import insert
+
+from .config import settings
+from .database import async_session
+from .models.posts import Posts
+from .models.timeline import TimelineEntry
+from .models.user import Users, followers_table
+
+# how many of a followee's latest posts land in a timeline on follow
+FOLLOW_BACKFILL_SIZE = 50
+
+
+def celebrity_followees(user_id: UUID):
+    """Followees of user_id whose posts are not fanned out on write."""
+    return select(Users.id).where(
+        Users.id.in_(
+            select(followers_table.c.followee_id).where(
+                followers_table.c.follower_id == user_id
+            )
+        ),
+        Users.follower_count > settings.TIMELINE_FANOUT_THRESHOLD,
+    )
+
+
+async def fan_out_post(post_id: UUID, author_id: UUID, created_at) -> None:
+    async with async_session() as db:
+        # the author always sees their own post
+        await db.execute(
+            insert(TimelineEntry)
+            .values(
+                user_id=author_id,
+                post_id=post_id,
+                author_id=author_id,
+                created_at=created_at,
+            )
+            .on_conflict_do_nothing()
+        )
+
+        follower_count = await db.scalar(
+            select(Users.follower_count).where(Users.id == author_id)
+        )
+
+        if follower_count <= settings.TIMELINE_FANOUT_THRESHOLD:
+            # a follow backfill may have added the post for some followers
+            await db.execute(
+                insert(TimelineEntry)
+                .from_select(
+                    ["user_id", "post_id", "author_id", "created_at"],
+                    select(
+                        followers_table.c.follower_id,
+                        literal(post_id),
+                        literal(author_id),
+                        literal(created_at),
+                    ).where(followers_table.c.followee_id == author_id),
+                )
+                .on_conflict_do_nothing()
+            )
+
+        await db.commit()
+
+
+async def backfill_timeline(user_id: UUID, followee_id: UUID) -> None:
+    async with async_session() as db:
+        # an unfollow may have run before this job. Holding the follow row
+        # also makes a concurrent unfollow wait for us and then delete what
+        # we insert, instead of us putting the entries back after it.
+        following = await db.scalar(
+            select(literal(True))
+            .select_from(followers_table)
+            .where(
+                followers_table.c.follower_id == user_id,
+                followers_table.c.followee_id == followee_id,
+            )
+            .with_for_update(read=True)
+        )
+        if not following:
+            return
+
+        latest = (
+            select(Posts.id, Posts.created_at)
+            .where(Posts.user_id == followee_id)
+            .order_by(Posts.created_at.desc())
+            .limit(FOLLOW_BACKFILL_SIZE)
+            .subquery()
+        )
+
+        # fan-out may have delivered some of them already
+        await db.execute(
+            insert(TimelineEntry)
+            .from_select(
+                ["user_id", "post_id", "author_id", "created_at"],
+                select(
+                    literal(user_id),
+                    latest.c.id,
+                    literal(followee_id),
+                    latest.c.created_at,
+                ),
+            )
+            .on_conflict_do_nothing()
+        )
+        await db.commit()
+
+
+def remove_from_timeline(user_id: UUID, author_id: UUID):
+    return delete(TimelineEntry).where(
+        TimelineEntry.user_id == user_id, TimelineEntry.author_id == author_id
+    )
@@ -1,27 +1,117 @@
+import asyncio
+from dataclasses import dataclass
+from uuid import UUID
+from typing import AsyncGenerator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from passlib.context import CryptContext
 from jose import jwt, ExpiredSignatureError, JWTError
 from fastapi.security import OAuth2PasswordBearer
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, WebSocketException, status
 from datetime import datetime, timedelta
 from .config import settings
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 from sqlalchemy.future import select
 from app.models.user import Users
-from .database import get_db
+from .cache import TTLCache
+from .database import async_session, read_session, recent_writers
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl="api/auth/login", auto_error=False
+)
 
+# authenticated users keyed by token subject (user id, or email for older tokens)
+user_cache = TTLCache(settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
 
-def hash_user_password(user_pwd: str) -> str:
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """The authenticated user as get_current_user returns it.
+
+    Plain values rather than a Users instance, so the cached copy can be
+    shared between requests and nothing lazy-loads outside a session.
+    Handlers that change the user load its row themselves.
+    """
+
+    id: UUID
+    first_name: str
+    last_name: str
+    email: str
+    image_path: str | None
+    image_variants: dict | None
+
+    @classmethod
+    def from_row(cls, user: Users) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            email=user.email,
+            image_path=user.image_path,
+            image_variants=user.image_variants,
+        )
+
+
+def _hash_password(user_pwd: str) -> str:
     return pwd_context.hash(user_pwd)
 
 
-def check_password(user_pwd: str, hashed_pwd: str) -> bool:
+def _verify_password(user_pwd: str, hashed_pwd: str) -> bool:
     return pwd_context.verify(user_pwd, hashed_pwd)
 
 
+def _password_executor() -> Executor:
+    # bcrypt releases the GIL, so threads are enough unless the worker is CPU starved
+    if settings.PASSWORD_HASH_EXECUTOR == "process":
+        return ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+    return ThreadPoolExecutor(
+        max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"
+    )
+
+
+password_executor = _password_executor()
+
+# hashes running or waiting for a free executor worker
+password_jobs = 0
+
+
+async def _run_password_job(func, *args):
+    global password_jobs
+
+    if (
+        password_jobs
+        >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, try again",
+            headers={"Retry-After": "1"},
+        )
+
+    password_jobs += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+    finally:
+        password_jobs -= 1
+
+
+async def hash_user_password(user_pwd: str) -> str:
+    return await _run_password_job(_hash_password, user_pwd)
+
+
+async def check_password(user_pwd: str, hashed_pwd: str) -> bool:
+    return await _run_password_job(_verify_password, user_pwd, hashed_pwd)
+
+
+def token_claims(user: Users) -> dict:
+    return {"data": user.email, "sub": str(user.id)}
+
+
 def create_access_token(data: dict) -> str:
     data = data.copy()
     expire = datetime.now() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -40,47 +130,130 @@ def create_refresh_token(data: dict) -> str:
     return token
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
-):
-    if not token:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing token"
-        )
+def token_subject(token: str) -> str | None:
     try:
         payload = jwt.decode(
             token, key=settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
         )
-        email = payload.get("data")
+    except JWTError:
+        return None
+    return payload.get("sub") or payload.get("data")
 
-        if not email:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST)
 
-        query = select(Users).where(Users.email == email)
+async def get_token_subject(
+    token: str | None = Depends(optional_oauth2_scheme),
+) -> str | None:
+    """Subject of the request's token, None without a valid one.
 
-        result = await db.execute(query)
+    User id, or email for older tokens. As a dependency it is decoded once
+    per request, however many other dependencies need it.
+    """
+    return token_subject(token) if token else None
 
-        user = result.scalars().first()
 
-        if user is None:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail="User does not exist"
-            )
+def _session_for(subject: str | None) -> sessionmaker:
+    if subject and recent_writers.get(subject):
+        return async_session
+    return read_session
 
-        return user
-    except JWTError:
+
+async def get_db(
+    subject: str | None = Depends(get_token_subject),
+) -> AsyncGenerator[AsyncSession, None]:
+    """Session on the primary; a commit pins the token user's reads to it."""
+    async with async_session() as db:
+        db.info["subject"] = subject
+        yield db
+
+
+async def get_read_db(
+    subject: str | None = Depends(get_token_subject),
+) -> AsyncGenerator[AsyncSession, None]:
+    """Session on the read replica, or on the primary for a user who just wrote.
+
+    The pin is per worker process: a write handled by another worker shows
+    up once the replica catches up, so keep replica lag under
+    READ_YOUR_WRITES_SECONDS or route a user to one worker.
+    """
+    async with _session_for(subject)() as db:
+        yield db
+
+
+async def load_user(subject: str, db: AsyncSession) -> CurrentUser:
+    cached = user_cache.get(subject)
+    if cached is not None:
+        return cached
+
+    if "@" in subject:
+        query = select(Users).where(Users.email == subject)
+    else:
+        query = select(Users).where(Users.id == UUID(subject))
+
+    user = await db.scalar(query)
+    if user is None:
+        # signed up a moment ago, the replica may not have the row yet
+        async with async_session() as primary:
+            user = await primary.scalar(query)
+
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="User does not exist"
+        )
+
+    current = CurrentUser.from_row(user)
+    user_cache.set(subject, current)
+    return current
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    subject: str | None = Depends(get_token_subject),
+    db: AsyncSession = Depends(get_read_db),
+) -> CurrentUser:
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing token"
+        )
+    if subject is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
         )
+    return await load_user(subject, db)
+
+
+async def get_websocket_user(token: str | None = Query(None)) -> CurrentUser:
+    # browsers cannot set headers on a websocket, the token comes as ?token=
+    subject = token_subject(token) if token else None
+    try:
+        if subject is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+            )
+        async with _session_for(subject)() as db:
+            return await load_user(subject, db)
+    except HTTPException as error:
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION, reason=error.detail
+        )
+
+
+def invalidate_user(user: Users | CurrentUser) -> None:
+    user_cache.invalidate(str(user.id))
+    user_cache.invalidate(user.email)
+
+
+@event.listens_for(Users, "after_delete")
+def forget_deleted_user(mapper, connection, user: Users) -> None:
+    # other workers keep their copy until USER_CACHE_TTL_SECONDS runs out
+    invalidate_user(user)
 
 
-async def verify_refresh_token(token: str):
+async def verify_refresh_token(token: str) -> dict:
     try:
         payload = jwt.decode(
             token, key=settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
         )
-        email = payload.get("data")
-        return email
+        return {key: payload[key] for key in ("data", "sub") if payload.get(key)}
 
     except JWTError:
         raise HTTPException(
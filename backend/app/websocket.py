@@ -1,19 +1,137 @@
-import json
-from fastapi import WebSocket
+import asyncio, json, logging
+from collections import deque
+from functools import partial
+from uuid import uuid4
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
+
+from .broker import Broker, create_broker
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+FEED_CHANNEL = "feed"
+
+
+def chat_channel(chat_id: str) -> str:
+    return f"chat:{chat_id}"
+
+
+class Client:
+    """A websocket with a bounded outbox drained by its own writer task.
+
+    Fan-out only enqueues, so a slow client never delays the others; a
+    client whose outbox fills up is evicted instead of buffering forever.
+    """
+
+    def __init__(self, websocket: WebSocket, manager: "ConnectionManager") -> None:
+        self.websocket = websocket
+        self.manager = manager
+        self.outbox: asyncio.Queue = asyncio.Queue(settings.WS_SEND_QUEUE_SIZE)
+        self.writer = asyncio.create_task(self._write())
+
+    def send(self, message: str) -> bool:
+        try:
+            self.outbox.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _write(self) -> None:
+        while True:
+            message = await self.outbox.get()
+            try:
+                await self.websocket.send_text(message)
+            except Exception:
+                await self.manager.evict(self.websocket)
+                return
 
 
 class ConnectionManager:
-    def __init__(self) -> None:
+    """Websockets connected to this worker.
+
+    Messages go out through the broker, so a chat message reaches the
+    recipient even when their socket lives in another worker. A worker
+    only subscribes to the chats it has local sockets for.
+
+    Feed events carry a cursor and the last WS_FEED_HISTORY_SIZE are kept,
+    so a reconnecting client resumes from its cursor instead of reloading
+    the feed. The history restarts whenever the worker drops the feed
+    subscription, older cursors then fall back to a snapshot.
+    """
+
+    def __init__(self, broker: Broker) -> None:
+        self.broker = broker
         self.active_connections = []
+        # accepted feed sockets still waiting for their snapshot
+        self.joining: set[WebSocket] = set()
+        self.feed_history: deque[tuple[str, str]] = deque(
+            maxlen=settings.WS_FEED_HISTORY_SIZE
+        )
+        # cursor of the position just before the oldest kept event: the last
+        # event that fell out of the history, or a fresh token when it starts
+        self.history_start = uuid4().hex
         self.chat_connections = {}
+        self.clients: dict[WebSocket, Client] = {}
+        self.dropped_messages = 0
+        self.evicted_connections = 0
+
+    async def start(self):
+        await self.broker.start()
+
+    async def close(self):
+        for client in list(self.clients.values()):
+            client.writer.cancel()
+        self.clients.clear()
+        await self.broker.close()
 
     async def connect(self, websocket: WebSocket):
+        """Accept a feed socket; events reach it once join_feed is called."""
         await websocket.accept()
+        self._client(websocket)
+        subscribed = bool(self.active_connections or self.joining)
+        self.joining.add(websocket)
+        if not subscribed:
+            await self.broker.subscribe(FEED_CHANNEL, self._deliver_feed)
+
+    def feed_cursor(self) -> str:
+        """Cursor of the current position, also while no event was kept yet."""
+        return self.feed_history[-1][0] if self.feed_history else self.history_start
+
+    def can_resume(self, cursor: str) -> bool:
+        return cursor == self.history_start or any(
+            seen == cursor for seen, _ in self.feed_history
+        )
+
+    async def join_feed(self, websocket: WebSocket, since: str):
+        """Replay the events after cursor `since`, then deliver new ones.
+        Nothing is awaited in between, so no event is missed or sent twice.
+        """
+        if websocket not in self.joining:
+            return
+        client = self.clients[websocket]
+        # events after `since` fell out of the history while the snapshot
+        # loaded; dropping the client makes it reconnect for a new one
+        overflowed = not self.can_resume(since)
+        replaying = since == self.history_start
+        for cursor, message in self.feed_history:
+            if replaying:
+                overflowed = overflowed or not client.send(message)
+            replaying = replaying or cursor == since
+
+        self.joining.discard(websocket)
         self.active_connections.append(websocket)
+        if overflowed:
+            self.dropped_messages += 1
+            await self.evict(websocket)
 
     async def connect_chat(self, chat_id: str, websocket: WebSocket):
+        self._client(websocket)
         if chat_id not in self.chat_connections:
             self.chat_connections[chat_id] = set()
+            await self.broker.subscribe(
+                chat_channel(chat_id), partial(self._deliver_chat, chat_id)
+            )
         self.chat_connections[chat_id].add(websocket)
 
     async def disconnect_chat(self, chat_id: str, websocket: WebSocket):
@@ -21,28 +139,106 @@ class ConnectionManager:
             self.chat_connections[chat_id].discard(websocket)
             if not self.chat_connections[chat_id]:
                 del self.chat_connections[chat_id]
+                await self.broker.unsubscribe(chat_channel(chat_id))
+        self._release(websocket)
 
     async def send_personal_message(self, chat_id: str, message: str):
-        if chat_id in self.chat_connections:
-            for connection in self.chat_connections[chat_id]:
-                try:
-                    await connection.send_text(message)
-                except:
-                    pass
+        await self.broker.publish(chat_channel(chat_id), message)
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            await connection.send_json(message)
+        message = {**message, "cursor": uuid4().hex}
+        # post texts are at most 1000 characters, which fits the 8000 byte
+        # NOTIFY limit as UTF-8 but not as \uXXXX escapes
+        await self.broker.publish(FEED_CHANNEL, json.dumps(message, ensure_ascii=False))
+
+    async def send_json(self, websocket: WebSocket, message: dict):
+        # direct replies share the outbox so the writer task stays the only sender
+        client = self.clients.get(websocket)
+        if client and not client.send(json.dumps(message)):
+            self.dropped_messages += 1
+            await self.evict(websocket)
+
+    async def receive_text(self, websocket: WebSocket) -> str:
+        """websocket.receive_text() that also ends with WebSocketDisconnect for
+        evicted sockets, where starlette raises RuntimeError since we closed them.
+        """
+        try:
+            return await websocket.receive_text()
+        except RuntimeError:
+            if websocket.application_state != WebSocketState.DISCONNECTED:
+                raise
+            raise WebSocketDisconnect(code=1013)
 
     async def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        if websocket in self.active_connections or websocket in self.joining:
+            if websocket in self.active_connections:
+                self.active_connections.remove(websocket)
+            self.joining.discard(websocket)
+            if not self.active_connections and not self.joining:
+                await self.broker.unsubscribe(FEED_CHANNEL)
+                # events published meanwhile never reach us, cursors go stale
+                self.feed_history.clear()
+                self.history_start = uuid4().hex
 
         for chat_id in list(self.chat_connections.keys()):
             if websocket in self.chat_connections[chat_id]:
-                self.chat_connections[chat_id].discard(websocket)
-                if not self.chat_connections[chat_id]:
-                    del self.chat_connections[chat_id]
+                await self.disconnect_chat(chat_id, websocket)
+        self._release(websocket)
+
+    async def evict(self, websocket: WebSocket):
+        if websocket not in self.clients:
+            return
+        self.evicted_connections += 1
+        await self.disconnect(websocket)
+        try:
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.clients),
+            "feed_connections": len(self.active_connections),
+            "feed_history": len(self.feed_history),
+            "chat_channels": len(self.chat_connections),
+            "dropped_messages": self.dropped_messages,
+            "evicted_connections": self.evicted_connections,
+        }
+
+    def _client(self, websocket: WebSocket) -> Client:
+        if websocket not in self.clients:
+            self.clients[websocket] = Client(websocket, self)
+        return self.clients[websocket]
+
+    def _release(self, websocket: WebSocket):
+        if (
+            websocket in self.active_connections
+            or websocket in self.joining
+            or any(
+                websocket in connections
+                for connections in self.chat_connections.values()
+            )
+        ):
+            return
+        client = self.clients.pop(websocket, None)
+        if client and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    async def _fan_out(self, connections, message: str):
+        overflowed = [ws for ws in connections if not self.clients[ws].send(message)]
+        for websocket in overflowed:
+            self.dropped_messages += 1
+            logger.warning("Evicting websocket with a full send queue")
+            await self.evict(websocket)
+
+    async def _deliver_chat(self, chat_id: str, message: str):
+        await self._fan_out(list(self.chat_connections.get(chat_id, ())), message)
+
+    async def _deliver_feed(self, message: str):
+        if len(self.feed_history) == self.feed_history.maxlen:
+            self.history_start = self.feed_history[0][0]
+        self.feed_history.append((json.loads(message)["cursor"], message))
+        await self._fan_out(list(self.active_connections), message)
 
 
-manager = ConnectionManager()
+manager = ConnectionManager(create_broker(settings.BROKER_URL))
@@ -0,0 +1,63 @@
+import asyncio, logging
+from typing import Any, Awaitable, Callable
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """In-process queue of async jobs drained by a fixed set of worker tasks."""
+
+    def __init__(self, workers: int, maxsize: int = 10000) -> None:
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.tasks: list[asyncio.Task] = []
+        self.periodic: list[tuple[float, Callable[..., Awaitable[Any]], tuple]] = []
+
+    def enqueue(self, func: Callable[..., Awaitable[Any]], *args: Any) -> None:
+        try:
+            self.queue.put_nowait((func, args))
+        except asyncio.QueueFull:
+            logger.error("Job queue full, dropping %s", func.__name__)
+
+    def every(
+        self, seconds: float, func: Callable[..., Awaitable[Any]], *args: Any
+    ) -> None:
+        """Enqueue func on start and then every `seconds`; call before start()."""
+        self.periodic.append((seconds, func, args))
+
+    async def start(self) -> None:
+        for _ in range(self.workers):
+            self.tasks.append(asyncio.create_task(self._worker()))
+        for seconds, func, args in self.periodic:
+            self.tasks.append(asyncio.create_task(self._repeat(seconds, func, args)))
+
+    async def stop(self, timeout: float = 10) -> None:
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Stopping with %d jobs still queued", self.queue.qsize())
+
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks.clear()
+
+    async def _repeat(self, seconds: float, func, args: tuple) -> None:
+        while True:
+            self.enqueue(func, *args)
+            await asyncio.sleep(seconds)
+
+    async def _worker(self) -> None:
+        while True:
+            func, args = await self.queue.get()
+            try:
+                await func(*args)
+            except Exception:
+                logger.exception("Job %s failed", func.__name__)
+            finally:
+                self.queue.task_done()
+
+
+jobs = JobQueue(settings.BACKGROUND_WORKERS)
@@ -0,0 +1,525 @@
+"""Latency, throughput and queries per request for every API route.
+
+Seeds the Postgres database from DATABASE_URL with benchmarks.fixtures,
+then drives the app in-process: HTTP through httpx's ASGI transport and
+websockets through a small ASGI client, so the numbers are the app and
+the database without a network in between. Queries per request come from
+the Server-Timing header.
+
+Run from backend/: python -m benchmarks.api --users 10000 --requests 200
+Compare two runs:  python -m benchmarks.compare before.json after.json
+"""
+
+import argparse, asyncio, json, platform, re, statistics, subprocess, time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+from urllib.parse import urlencode
+from uuid import uuid4
+
+import httpx
+
+from app.config import settings
+from app.database import engine
+from main import app
+from .fixtures import seed
+
+SERVER_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+PASSWORD = "benchmark1"
+
+
+class ASGIWebSocket:
+    """Just enough of a websocket client to talk to the app in-process."""
+
+    def __init__(self, path: str, params: dict) -> None:
+        self.scope = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": urlencode(params).encode(),
+            "root_path": "",
+            "headers": [],
+            "server": ("benchmark", 80),
+            "client": ("benchmark", 50000),
+            "subprotocols": [],
+        }
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.outgoing: asyncio.Queue = asyncio.Queue()
+        self.task: asyncio.Task | None = None
+
+    async def __aenter__(self) -> "ASGIWebSocket":
+        await self.incoming.put({"type": "websocket.connect"})
+        self.task = asyncio.create_task(
+            app(self.scope, self.incoming.get, self.outgoing.put)
+        )
+        message = await self.outgoing.get()
+        if message["type"] != "websocket.accept":
+            raise RuntimeError(f"{self.scope['path']} rejected: {message}")
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.incoming.put({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(self.task, 10)
+
+    async def receive_json(self, timeout: float = 10) -> dict:
+        message = await asyncio.wait_for(self.outgoing.get(), timeout)
+        if message["type"] != "websocket.send":
+            raise RuntimeError(f"{self.scope['path']} closed: {message}")
+        return json.loads(message["text"])
+
+    async def receive_until(self, predicate, timeout: float = 10) -> dict:
+        while True:
+            message = await self.receive_json(timeout)
+            if predicate(message):
+                return message
+
+
+@dataclass
+class BenchRun:
+    """What the scenarios of one run share besides the accounts."""
+
+    listener_count: int
+    # feed sockets waiting for the fan-out scenario's events, closed at the end
+    listeners: list[ASGIWebSocket] = field(default_factory=list)
+
+    async def close(self) -> None:
+        for ws in self.listeners:
+            await ws.__aexit__()
+        self.listeners.clear()
+
+
+@dataclass
+class BenchUser:
+    """One logged-in account per concurrent worker, plus ids to act on."""
+
+    client: httpx.AsyncClient
+    email: str
+    run: BenchRun
+    id: str = ""
+    refresh_token: str = ""
+    access_token: str = ""
+    feed_post_ids: list[str] = field(default_factory=list)
+    reply_ids: list[str] = field(default_factory=list)
+    author_ids: list[str] = field(default_factory=list)
+    own_post_id: str = ""
+    chat_id: str = ""
+    # prepared per scenario, consumed by the delete scenarios
+    deletable: list[str] = field(default_factory=list)
+
+    async def call(self, method: str, url: str, **kwargs) -> httpx.Response:
+        response = await self.client.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response
+
+
+@dataclass
+class Scenario:
+    name: str
+    run: Callable[[BenchUser, int], Awaitable[httpx.Response | float]]
+    # creates what run consumes: (user, count) before the clock starts
+    prepare: Callable[[BenchUser, int], Awaitable[None]] | None = None
+    # websocket deliveries interleave, these run on one worker
+    sequential: bool = False
+
+
+async def login(client: httpx.AsyncClient, index: int, run: BenchRun) -> BenchUser:
+    user = BenchUser(client, f"benchmark{index}@example.com", run)
+    account = {"email": user.email, "password": PASSWORD}
+    response = await client.post(
+        "/api/auth/register",
+        json={"first_name": "benchmark", "last_name": f"worker{index}", **account},
+    )
+    if response.status_code == 400:
+        response = await client.post("/api/auth/login", json=account)
+    tokens = response.json()
+    user.access_token = tokens["access_token"]
+    user.refresh_token = tokens["refresh_token"]
+    client.headers["Authorization"] = f"Bearer {user.access_token}"
+    user.id = (await user.call("GET", "/api/auth/me")).json()["id"]
+    return user
+
+
+async def set_up(user: BenchUser) -> None:
+    authors = await user.call("GET", "/api/search?q=audit&type=users&limit=20")
+    user.author_ids = [author["id"] for author in authors.json()["items"]]
+    for author_id in user.author_ids[:5]:
+        # follow is a toggle, a rerun may find it already followed
+        response = await user.call("POST", f"/api/auth/follow/{author_id}")
+        if response.json()["msg"] == "Unfollowed":
+            await user.call("POST", f"/api/auth/follow/{author_id}")
+
+    cursor = None
+    for _ in range(5):
+        url = f"/api/post/?before={cursor}" if cursor else "/api/post/"
+        page = (await user.call("GET", url)).json()
+        user.feed_post_ids += [post["id"] for post in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    for post_id in user.feed_post_ids:
+        replies = (await user.call("GET", f"/api/post/{post_id}")).json()
+        user.reply_ids += [reply["id"] for reply in replies]
+        if len(user.reply_ids) >= 50:
+            break
+
+    await user.call("POST", "/api/post/create", data={"text": "benchmark thread"})
+    own = (await user.call("GET", "/api/auth/user/posts")).json()
+    user.own_post_id = own[0]["id"]
+    if not user.reply_ids:
+        await user.call(
+            "POST", f"/api/post/{user.own_post_id}/reply/", data={"text": "reply"}
+        )
+        replies = (await user.call("GET", f"/api/post/{user.own_post_id}")).json()
+        user.reply_ids = [reply["id"] for reply in replies]
+
+    chat = await user.call(
+        "POST", "/api/chat/create", json={"recipient_id": user.author_ids[0]}
+    )
+    user.chat_id = chat.json()["id"]
+    await user.call(
+        "POST", f"/api/chat/{user.chat_id}/messages", json={"content": "hello"}
+    )
+
+
+def pick(ids: list[str], i: int) -> str:
+    return ids[i % len(ids)]
+
+
+async def prepare_posts(user: BenchUser, count: int) -> None:
+    for i in range(count):
+        await user.call("POST", "/api/post/create", data={"text": f"to delete {i}"})
+    own = (await user.call("GET", "/api/auth/user/posts")).json()
+    user.deletable = [post["id"] for post in own if post["id"] != user.own_post_id]
+
+
+async def prepare_replies(user: BenchUser, count: int) -> None:
+    url = f"/api/post/{user.own_post_id}/reply/"
+    for i in range(count):
+        await user.call("POST", url, data={"text": f"to delete {i}"})
+    replies = (await user.call("GET", f"/api/post/{user.own_post_id}")).json()
+    user.deletable = [
+        reply["id"] for reply in replies if reply["user"]["id"] == user.id
+    ]
+
+
+async def feed_snapshot(user: BenchUser, i: int) -> float:
+    start = time.perf_counter()
+    async with ASGIWebSocket("/api/post/ws", {"token": user.access_token}) as ws:
+        await ws.receive_json()
+    return time.perf_counter() - start
+
+
+async def connect_listeners(user: BenchUser, count: int) -> None:
+    # connected only now, so they do not queue up the earlier scenarios' events;
+    # count is the number of requests, the listeners are sized by the run
+    for _ in range(user.run.listener_count - len(user.run.listeners)):
+        ws = await ASGIWebSocket(
+            "/api/post/ws", {"token": user.access_token}
+        ).__aenter__()
+        await ws.receive_json()
+        user.run.listeners.append(ws)
+
+
+async def feed_fan_out(user: BenchUser, i: int) -> float:
+    # every listener has to see the new post, the slowest one counts
+    text = f"fan-out {uuid4().hex}"
+    start = time.perf_counter()
+    await user.call("POST", "/api/post/create", data={"text": text})
+    await asyncio.gather(
+        *(
+            ws.receive_until(
+                lambda m: m["type"] == "post_created" and m["post"]["text"] == text
+            )
+            for ws in user.run.listeners
+        )
+    )
+    return time.perf_counter() - start
+
+
+async def chat_delivery(user: BenchUser, i: int) -> float:
+    content = f"message {uuid4().hex}"
+    async with ASGIWebSocket(f"/api/chat/ws/{user.chat_id}", {}) as ws:
+        start = time.perf_counter()
+        await user.call(
+            "POST", f"/api/chat/{user.chat_id}/messages", json={"content": content}
+        )
+        await ws.receive_until(lambda m: m["message"]["content"] == content)
+        return time.perf_counter() - start
+
+
+SCENARIOS = [
+    # auth.py
+    Scenario(
+        "POST /auth/register",
+        lambda u, i: u.client.post(
+            "/api/auth/register",
+            json={
+                "first_name": "register",
+                "last_name": "benchmark",
+                "email": f"register-{uuid4().hex}@example.com",
+                "password": PASSWORD,
+            },
+        ),
+    ),
+    Scenario(
+        "POST /auth/login",
+        lambda u, i: u.client.post(
+            "/api/auth/login", json={"email": u.email, "password": PASSWORD}
+        ),
+    ),
+    Scenario(
+        "POST /auth/refresh",
+        lambda u, i: u.client.post(
+            "/api/auth/refresh", json={"refresh_token": u.refresh_token}
+        ),
+    ),
+    Scenario("GET /auth/me", lambda u, i: u.client.get("/api/auth/me")),
+    Scenario("GET /auth/user/posts", lambda u, i: u.client.get("/api/auth/user/posts")),
+    Scenario(
+        "POST /auth/me/update",
+        lambda u, i: u.client.post(
+            "/api/auth/me/update", data={"last_name": f"worker{i % 2}"}
+        ),
+    ),
+    Scenario(
+        "POST /auth/follow/{id}",
+        lambda u, i: u.client.post(f"/api/auth/follow/{pick(u.author_ids[5:], i)}"),
+    ),
+    Scenario(
+        "GET /auth/follow/recommendation",
+        lambda u, i: u.client.get("/api/auth/follow/recommendation"),
+    ),
+    # post.py
+    Scenario("GET /post/", lambda u, i: u.client.get("/api/post/")),
+    Scenario("GET /post/timeline", lambda u, i: u.client.get("/api/post/timeline")),
+    Scenario(
+        "GET /post/{id}",
+        lambda u, i: u.client.get(f"/api/post/{pick(u.feed_post_ids, i)}"),
+    ),
+    Scenario(
+        "POST /post/create",
+        lambda u, i: u.client.post("/api/post/create", data={"text": f"post {i}"}),
+    ),
+    Scenario(
+        "POST /post/uploads",
+        lambda u, i: u.client.post(
+            "/api/post/uploads", json={"content_type": "image/jpeg", "size": 1024}
+        ),
+    ),
+    Scenario(
+        "DELETE /post/delete/{id}",
+        lambda u, i: u.client.delete(f"/api/post/delete/{u.deletable[i]}"),
+        prepare_posts,
+    ),
+    Scenario(
+        "PUT /post/{id}/like",
+        lambda u, i: u.client.put(f"/api/post/{pick(u.feed_post_ids, i)}/like"),
+    ),
+    Scenario(
+        "DELETE /post/{id}/like",
+        lambda u, i: u.client.delete(f"/api/post/{pick(u.feed_post_ids, i)}/like"),
+    ),
+    Scenario(
+        "POST /post/create_delete_like/{id}/",
+        lambda u, i: u.client.post(
+            f"/api/post/create_delete_like/{pick(u.feed_post_ids, i)}/"
+        ),
+    ),
+    Scenario(
+        "POST /post/{id}/reply/",
+        lambda u, i: u.client.post(
+            f"/api/post/{pick(u.feed_post_ids, i)}/reply/", data={"text": f"reply {i}"}
+        ),
+    ),
+    Scenario(
+        "DELETE /post/reply/{id}/",
+        lambda u, i: u.client.delete(f"/api/post/reply/{u.deletable[i]}/"),
+        prepare_replies,
+    ),
+    Scenario(
+        "PUT /post/reply/{id}/like",
+        lambda u, i: u.client.put(f"/api/post/reply/{pick(u.reply_ids, i)}/like"),
+    ),
+    Scenario(
+        "DELETE /post/reply/{id}/like",
+        lambda u, i: u.client.delete(f"/api/post/reply/{pick(u.reply_ids, i)}/like"),
+    ),
+    Scenario(
+        "POST /post/reply/{id}/create-delete-like/",
+        lambda u, i: u.client.post(
+            f"/api/post/reply/{pick(u.reply_ids, i)}/create-delete-like/"
+        ),
+    ),
+    # chat.py
+    Scenario(
+        "POST /chat/create",
+        lambda u, i: u.client.post(
+            "/api/chat/create", json={"recipient_id": pick(u.author_ids, i)}
+        ),
+    ),
+    Scenario("GET /chat/", lambda u, i: u.client.get("/api/chat/")),
+    Scenario(
+        "GET /chat/{id}/messages",
+        lambda u, i: u.client.get(f"/api/chat/{u.chat_id}/messages"),
+    ),
+    Scenario(
+        "POST /chat/{id}/messages",
+        lambda u, i: u.client.post(
+            f"/api/chat/{u.chat_id}/messages", json={"content": f"message {i}"}
+        ),
+    ),
+    # search.py
+    Scenario("GET /search posts", lambda u, i: u.client.get("/api/search?q=number")),
+    Scenario(
+        "GET /search users",
+        lambda u, i: u.client.get("/api/search?q=user1&type=users"),
+    ),
+    # websockets
+    Scenario("WS /post/ws snapshot", feed_snapshot),
+    Scenario(
+        "WS /post/ws post_created", feed_fan_out, connect_listeners, sequential=True
+    ),
+    Scenario("WS /chat/ws delivery", chat_delivery, sequential=True),
+]
+
+# needs a real object in S3, not exercised
+SKIPPED = {"POST /post/create/finalize": "needs an uploaded S3 object"}
+
+
+def percentile(values: list[float], q: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+async def run_scenario(
+    scenario: Scenario, users: list[BenchUser], requests: int, warmup: int
+) -> dict:
+    workers = users[:1] if scenario.sequential else users
+    per_worker = -(-(requests + warmup) // len(workers))
+    if scenario.prepare:
+        for user in workers:
+            await scenario.prepare(user, per_worker)
+
+    timings: list[float] = []
+    queries: list[int] = []
+    db_ms: list[float] = []
+    errors = 0
+
+    async def worker(user: BenchUser) -> None:
+        nonlocal errors
+        for i in range(per_worker):
+            start = time.perf_counter()
+            result = await scenario.run(user, i)
+            elapsed = time.perf_counter() - start
+            if i < warmup // len(workers):
+                continue
+            if isinstance(result, float):
+                timings.append(result)
+                continue
+            timings.append(elapsed)
+            if result.status_code >= 400:
+                errors += 1
+            timing = SERVER_TIMING.search(result.headers.get("server-timing", ""))
+            if timing:
+                db_ms.append(float(timing.group(1)))
+                queries.append(int(timing.group(2)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(user) for user in workers))
+    wall = time.perf_counter() - start
+
+    return {
+        "requests": len(timings),
+        "concurrency": len(workers),
+        "errors": errors,
+        "p50_ms": round(percentile(timings, 50) * 1000, 2),
+        "p95_ms": round(percentile(timings, 95) * 1000, 2),
+        "p99_ms": round(percentile(timings, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 2),
+        "throughput_rps": round(len(timings) / wall, 1),
+        "queries_per_request": (
+            round(statistics.fmean(queries), 2) if queries else None
+        ),
+        "db_ms_per_request": round(statistics.fmean(db_ms), 2) if db_ms else None,
+    }
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def main(args: argparse.Namespace) -> dict:
+    await seed(args.users)
+    settings.SERVER_TIMING_ENABLED = True
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        clients = [
+            httpx.AsyncClient(transport=transport, base_url="http://benchmark")
+            for _ in range(args.concurrency)
+        ]
+        run = BenchRun(args.listeners)
+        users = [await login(client, i, run) for i, client in enumerate(clients)]
+        for user in users:
+            await set_up(user)
+
+        selected = [s for s in SCENARIOS if not args.only or args.only in s.name]
+        for scenario in selected:
+            results[scenario.name] = await run_scenario(
+                scenario, users, args.requests, args.warmup
+            )
+            print(scenario.name, results[scenario.name])
+
+        await run.close()
+        for client in clients:
+            await client.aclose()
+    await engine.dispose()
+
+    return {
+        "meta": {
+            "commit": commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "listeners": args.listeners,
+            "database": engine.dialect.name,
+            "python": platform.python_version(),
+        },
+        "skipped": SKIPPED,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--listeners", type=int, default=50)
+    parser.add_argument("--only", help="run the scenarios whose name contains this")
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    output = args.output or Path(
+        f"benchmarks/results/{report['meta']['commit']}-{args.users}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print("saved", output)
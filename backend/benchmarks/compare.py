@@ -0,0 +1,63 @@
+"""Compare two benchmarks.api result files route by route.
+
+Run from backend/: python -m benchmarks.compare before.json after.json
+Exits 1 when a route's p95 got slower by more than --threshold percent or
+it started running more queries per request.
+"""
+
+import argparse, json, sys
+from pathlib import Path
+
+COLUMNS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "queries_per_request")
+
+
+def change(before, after) -> str:
+    if before is None or after is None:
+        return f"{after}"
+    if not before:
+        return f"{after} (was 0)"
+    return f"{after} ({(after - before) / before * 100:+.0f}%)"
+
+
+def regressions(before: dict, after: dict, threshold: float) -> list[str]:
+    found = []
+    for name, new in after.items():
+        old = before.get(name)
+        if old is None:
+            continue
+        if old["p95_ms"] and new["p95_ms"] > old["p95_ms"] * (1 + threshold / 100):
+            found.append(f"{name}: p95 {old['p95_ms']} -> {new['p95_ms']} ms")
+        queries = old["queries_per_request"], new["queries_per_request"]
+        if None not in queries and queries[1] > queries[0]:
+            found.append(f"{name}: {queries[0]} -> {queries[1]} queries per request")
+    return found
+
+
+def main(before_path: Path, after_path: Path, threshold: float) -> int:
+    before, after = (json.loads(path.read_text()) for path in (before_path, after_path))
+    print(f"{before['meta']['commit']} -> {after['meta']['commit']}")
+    if before["meta"]["users"] != after["meta"]["users"]:
+        print("warning: the runs seeded different --users, latencies do not compare")
+
+    width = max(len(name) for name in after["results"])
+    print("route".ljust(width), *(column.ljust(22) for column in COLUMNS))
+    for name, new in after["results"].items():
+        old = before["results"].get(name, {})
+        print(
+            name.ljust(width),
+            *(change(old.get(column), new[column]).ljust(22) for column in COLUMNS),
+        )
+
+    found = regressions(before["results"], after["results"], threshold)
+    for line in found:
+        print("REGRESSION", line)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    parser.add_argument("--threshold", type=float, default=10)
+    args = parser.parse_args()
+    sys.exit(main(args.before, args.after, args.threshold))
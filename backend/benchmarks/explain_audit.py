@@ -0,0 +1,147 @@
+"""Fail when a query the endpoints emit plans a sequential scan on a big table.
+
+Seeds large fixtures into the database from DATABASE_URL, drives the API
+through ASGI, records every statement sent to Postgres and EXPLAINs it
+with the parameters it ran with. Point DATABASE_URL (.env) at a scratch
+database, the fixtures are not cleaned up.
+
+Run from backend/: python -m benchmarks.explain_audit --users 20000
+Exits 1 when a statement seq-scans a table with more than --min-rows rows.
+tests/test_explain_audit.py runs it against TEST_POSTGRES_URL.
+"""
+
+import argparse, asyncio, sys
+
+import httpx
+from sqlalchemy import event, text
+
+from app.database import engine
+from main import app
+from .fixtures import seed
+from .plans import explain, plan_nodes
+
+statements: list[tuple[str, str, tuple]] = []
+current_step = "startup"
+
+
+def record(conn, cursor, statement, parameters, context, executemany):
+    # background jobs run concurrently, their statements land in the current step
+    if not executemany:
+        statements.append((current_step, statement, tuple(parameters or ())))
+
+
+async def drive(client: httpx.AsyncClient) -> None:
+    global current_step
+
+    async def call(method: str, url: str, **kwargs) -> httpx.Response:
+        global current_step
+        current_step = f"{method} {url.split('?')[0]}"
+        response = await client.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    account = {"email": "audit-probe@example.com", "password": "password1"}
+    response = await client.post(
+        "/api/auth/register",
+        json={"first_name": "audit", "last_name": "probe", **account},
+    )
+    if response.status_code == 400:
+        response = await client.post("/api/auth/login", json=account)
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+    feed = (await call("GET", "/api/post/")).json()
+    await call("GET", f"/api/post/?before={feed['next_cursor']}")
+    post_id = feed["items"][0]["id"]
+    authors = (await call("GET", "/api/search?q=user1&type=users")).json()
+    author_id = authors["items"][0]["id"]
+
+    # follow, unfollow and follow again: both paths get recorded
+    await call("POST", f"/api/auth/follow/{author_id}")
+    await call("POST", f"/api/auth/follow/{author_id}")
+    await call("POST", f"/api/auth/follow/{author_id}")
+    await asyncio.sleep(1)
+
+    timeline = (await call("GET", "/api/post/timeline")).json()
+    if timeline["next_cursor"]:
+        await call("GET", f"/api/post/timeline?before={timeline['next_cursor']}")
+
+    replies = (await call("GET", f"/api/post/{post_id}")).json()
+    await call("PUT", f"/api/post/{post_id}/like")
+    await call("DELETE", f"/api/post/{post_id}/like")
+    await call("POST", f"/api/post/{post_id}/reply/", data={"text": "audit reply"})
+    if replies:
+        reply_id = replies[0]["id"]
+        await call("PUT", f"/api/post/reply/{reply_id}/like")
+        await call("DELETE", f"/api/post/reply/{reply_id}/like")
+
+    await call("POST", "/api/post/create", data={"text": "audit post"})
+    own = (await call("GET", "/api/auth/user/posts")).json()
+    await call("DELETE", f"/api/post/delete/{own[0]['id']}")
+
+    await call("GET", "/api/auth/me")
+    await call("GET", "/api/auth/follow/recommendation")
+    for kind in ("posts", "replies", "users"):
+        await call("GET", f"/api/search?q=number&type={kind}")
+
+    chat = await call("POST", "/api/chat/create", json={"recipient_id": author_id})
+    chat_id = chat.json()["id"]
+    await call("POST", f"/api/chat/{chat_id}/messages", json={"content": "hello"})
+    messages = (await call("GET", f"/api/chat/{chat_id}/messages")).json()
+    if messages["before"]:
+        await call("GET", f"/api/chat/{chat_id}/messages?before={messages['before']}")
+    await call("GET", "/api/chat/")
+    current_step = "done"
+
+
+async def table_sizes(conn) -> dict[str, float]:
+    result = await conn.execute(
+        text("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'")
+    )
+    return dict(result.all())
+
+
+async def main(users: int, min_rows: int) -> int:
+    await seed(users)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://audit") as c:
+            await drive(c)
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    failures = 0
+    seen = set()
+    async with engine.connect() as conn:
+        sizes = await table_sizes(conn)
+        for step, statement, parameters in statements:
+            verb = statement.lstrip().split(None, 1)[0].upper()
+            if verb not in ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH"):
+                continue
+            if (step, statement) in seen:
+                continue
+            seen.add((step, statement))
+
+            plan = await explain(conn, statement, parameters)
+            scans = [
+                node["Relation Name"]
+                for node in plan_nodes(plan["Plan"])
+                if node["Node Type"] == "Seq Scan"
+                and sizes.get(node["Relation Name"], 0) > min_rows
+            ]
+            if scans:
+                failures += 1
+                print(f"SEQ SCAN on {', '.join(scans)} in {step}:")
+                print("   ", " ".join(statement.split())[:300])
+
+        print(f"{len(seen)} statements checked, {failures} with sequential scans")
+    await engine.dispose()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--min-rows", type=int, default=1_000)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.users, args.min_rows)))
@@ -0,0 +1,132 @@
+"""Synthetic users, follows, posts, likes, replies and chats for benchmarks.
+
+Deterministic: row g always links the same users and posts, so two runs
+at the same --users see the same data. Roughly 80 rows per user, --users
+125 is ~10k rows and --users 125000 ~10M. Seeding is skipped when the
+database already has that many users; point DATABASE_URL (.env) at a
+scratch database, the fixtures are not cleaned up.
+
+Run `alembic upgrade head` against that database first, the benchmarks
+do not create the schema.
+"""
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.recommendations import refresh_recommendations
+
+SEED = [
+    """
+    INSERT INTO users (id, first_name, last_name, email, hashed_password)
+    SELECT gen_random_uuid(), 'user' || g, 'audit', 'audit' || g || '@example.com', '!'
+    FROM generate_series(1, :users) AS g
+    """,
+    "CREATE TEMP TABLE audit_users AS"
+    " SELECT id, row_number() OVER (ORDER BY id) AS n FROM users",
+    """
+    INSERT INTO posts (id, text, created_at, user_id, like_count, reply_count)
+    SELECT gen_random_uuid(), 'post number ' || g, now() - make_interval(secs => g),
+           u.id, 0, 0
+    FROM generate_series(1, :users * 10) AS g
+    JOIN audit_users u ON u.n = 1 + g % :users
+    """,
+    "CREATE TEMP TABLE audit_posts AS"
+    " SELECT id, user_id, created_at, row_number() OVER (ORDER BY id) AS n FROM posts",
+    """
+    INSERT INTO followers (follower_id, followee_id)
+    SELECT a.id, b.id
+    FROM generate_series(1, :users * 20) AS g
+    JOIN audit_users a ON a.n = 1 + g % :users
+    JOIN audit_users b ON b.n = 1 + (g * 131) % :users
+    WHERE a.id <> b.id
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO post_likes (id, user_id, post_id)
+    SELECT gen_random_uuid(), u.id, p.id
+    FROM generate_series(1, :users * 25) AS g
+    JOIN audit_users u ON u.n = 1 + g % :users
+    JOIN audit_posts p ON p.n = 1 + (g * 7919) % (:users * 10)
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO post_replies (id, reply, created_at, like_count, user_id, post_id)
+    SELECT gen_random_uuid(), 'reply number ' || g, now(), 0, u.id, p.id
+    FROM generate_series(1, :users * 5) AS g
+    JOIN audit_users u ON u.n = 1 + (g * 31) % :users
+    JOIN audit_posts p ON p.n = 1 + g % (:users * 10)
+    """,
+    """
+    INSERT INTO reply_likes (id, created_at, user_id, reply_id)
+    SELECT gen_random_uuid(), now(), u.id, r.id
+    FROM (SELECT id, row_number() OVER (ORDER BY id) AS n FROM post_replies) AS r
+    JOIN audit_users u ON u.n = 1 + r.n % :users
+    """,
+    """
+    INSERT INTO timeline_entries (user_id, post_id, author_id, created_at)
+    SELECT u.id, p.id, p.user_id, p.created_at
+    FROM generate_series(1, :users * 20) AS g
+    JOIN audit_users u ON u.n = 1 + g % :users
+    JOIN audit_posts p ON p.n = 1 + (g * 17) % (:users * 10)
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO chats (id, is_private, created_at, user1_id, user2_id)
+    SELECT gen_random_uuid(), true, now(), a.id, b.id
+    FROM audit_users a JOIN audit_users b ON b.n = 1 + (a.n * 97) % :users
+    WHERE a.id <> b.id
+    """,
+    """
+    INSERT INTO messages (id, chat_id, sender_id, content, created_at, is_deleted)
+    SELECT gen_random_uuid(), c.id, c.user1_id, 'message ' || g,
+           now() - make_interval(secs => g), false
+    FROM (SELECT id, user1_id, row_number() OVER (ORDER BY id) AS n FROM chats) AS c
+    CROSS JOIN generate_series(1, 15) AS g
+    """,
+    """
+    UPDATE chats SET last_message_id = m.id, last_message_at = m.created_at
+    FROM (
+        SELECT DISTINCT ON (chat_id) chat_id, id, created_at
+        FROM messages ORDER BY chat_id, created_at DESC
+    ) AS m
+    WHERE m.chat_id = chats.id
+    """,
+    """
+    UPDATE users SET
+        post_count = (SELECT count(*) FROM posts WHERE posts.user_id = users.id),
+        follower_count = (
+            SELECT count(*) FROM followers WHERE followers.followee_id = users.id
+        ),
+        following_count = (
+            SELECT count(*) FROM followers WHERE followers.follower_id = users.id
+        )
+    """,
+    # the scenarios unlike what was liked here, the counters must match the rows
+    """
+    UPDATE posts SET
+        like_count = (
+            SELECT count(*) FROM post_likes WHERE post_likes.post_id = posts.id
+        ),
+        reply_count = (
+            SELECT count(*) FROM post_replies WHERE post_replies.post_id = posts.id
+        )
+    """,
+    """
+    UPDATE post_replies SET like_count = (
+        SELECT count(*) FROM reply_likes WHERE reply_likes.reply_id = post_replies.id
+    )
+    """,
+]
+
+
+async def seed(users: int) -> None:
+    async with engine.begin() as conn:
+        if await conn.scalar(text("SELECT count(*) FROM users")) >= users:
+            return
+        for statement in SEED:
+            await conn.execute(text(statement), {"users": users})
+            print("seeded:", " ".join(statement.split())[:60])
+    await refresh_recommendations()
+    async with engine.connect() as conn:
+        await conn.execute(text("ANALYZE"))
+        await conn.commit()
@@ -0,0 +1,79 @@
+"""Event-loop lag during a login storm, bcrypt inline vs. in the executor.
+
+Run from backend/: python -m benchmarks.password_hashing --logins 50
+"""
+
+import argparse, asyncio, os, statistics, time
+
+# app.config needs these, the benchmark never talks to a database or S3
+for key, value in {
+    "DATABASE_URL": "sqlite+aiosqlite://",
+    "JWT_ALGORITHM": "HS256",
+    "JWT_SECRET": "benchmark",
+    "AWS_ACCESS_KEY_ID": "x",
+    "AWS_SECRET_ACCESS_KEY": "x",
+    "AWS_BUCKET_NAME": "x",
+    "AWS_REGION": "us-east-1",
+}.items():
+    os.environ.setdefault(key, value)
+
+from app import utils
+
+TICK = 0.005
+
+
+async def measure_lag(stop: asyncio.Event, lags: list[float]) -> None:
+    # how late does a 5ms sleep wake up while logins are running
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def inline_login(password: str, hashed: str) -> bool:
+    return utils._verify_password(password, hashed)
+
+
+async def executor_login(password: str, hashed: str) -> bool:
+    return await utils.check_password(password, hashed)
+
+
+async def storm(login, logins: int, hashed: str) -> dict:
+    stop = asyncio.Event()
+    lags: list[float] = []
+    ticker = asyncio.create_task(measure_lag(stop, lags))
+    await asyncio.sleep(TICK * 2)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(login("password1", hashed) for _ in range(logins)),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    return {
+        "logins": logins,
+        "rejected": sum(isinstance(r, Exception) for r in results),
+        "seconds": round(elapsed, 3),
+        "lag_p50_ms": round(statistics.median(lags_ms), 2),
+        "lag_p99_ms": round(lags_ms[int(len(lags_ms) * 0.99) - 1], 2),
+        "lag_max_ms": round(lags_ms[-1], 2),
+    }
+
+
+async def main(logins: int) -> None:
+    hashed = utils._hash_password("password1")
+
+    for name, login in (("inline", inline_login), ("executor", executor_login)):
+        print(name, await storm(login, logins, hashed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins))
@@ -0,0 +1,27 @@
+import json
+
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+
+async def explain(
+    conn: AsyncConnection, statement: str, parameters=(), analyze: bool = False
+) -> dict:
+    """EXPLAIN a statement as the driver sees it ($n placeholders, positional)."""
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    result = await conn.exec_driver_sql(
+        f"EXPLAIN ({options}) {statement}", tuple(parameters)
+    )
+    plan = result.scalar()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]
+
+
+async def explain_query(conn: AsyncConnection, query, analyze: bool = False) -> dict:
+    compiled = query.compile(dialect=conn.dialect)
+    parameters = [compiled.params[name] for name in compiled.positiontup]
+    return await explain(conn, compiled.string, parameters, analyze)
+
+
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from plan_nodes(child)
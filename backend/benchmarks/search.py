@@ -0,0 +1,170 @@
+"""Search latency and query plans over a large posts table.
+
+Needs the Postgres database from DATABASE_URL (.env) at the latest migration.
+Seeds --posts rows for a dedicated benchmark user once, reruns reuse them.
+
+Run from backend/: python -m benchmarks.search --posts 1000000
+Clean up with:     python -m benchmarks.search --drop
+"""
+
+import argparse, asyncio, statistics, time
+from uuid import uuid4
+
+from sqlalchemy import String, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.database import async_session, engine
+from app.endpoints.search import (
+    search_posts_query,
+    build_search_page,
+    SEARCH_PAGE_SIZE,
+)
+from app.endpoints.post import serialize_post
+from .plans import explain_query, plan_nodes
+
+BENCHMARK_EMAIL = "search-benchmark@example.com"
+
+# real words first: the seed favours low indexes, so these are the common terms
+WORDS = """
+    coffee morning weekend football music concert travel photo sunset project
+    release python database startup coding garden recipe dinner movie series
+    launch meeting holiday mountain river city train airport festival birthday
+    weather rain summer winter school exam library museum market election
+    science space rocket planet ocean beach island forest camera guitar
+""".split() + [f"topic{i}" for i in range(20000)]
+
+QUERIES = {
+    "common": "coffee",
+    "two_terms": "coffee morning",
+    "phrase": '"sunset beach"',
+    "mid": "topic300",
+    "rare": "topic19999",
+    "missing": "zzzunknownword",
+}
+
+SEED_POSTS = text("""
+    INSERT INTO posts (id, text, created_at, user_id, like_count, reply_count)
+    SELECT gen_random_uuid(),
+           array_to_string(ARRAY(
+               SELECT (:words)[1 + floor(power(random(), 3) * cardinality(:words))::int]
+               FROM generate_series(1, 6 + g % 10)
+           ), ' '),
+           now() - make_interval(secs => g),
+           :user_id, 0, 0
+    FROM generate_series(:start, :stop) AS g
+    """).bindparams(bindparam("words", type_=ARRAY(String)))
+
+
+async def benchmark_user() -> tuple:
+    async with async_session() as db:
+        await db.execute(
+            text(
+                "INSERT INTO users (id, first_name, last_name, email, hashed_password)"
+                " VALUES (:id, 'search', 'benchmark', :email, '!')"
+                " ON CONFLICT (email) DO NOTHING"
+            ),
+            {"id": uuid4(), "email": BENCHMARK_EMAIL},
+        )
+        user_id = await db.scalar(
+            text("SELECT id FROM users WHERE email = :email"),
+            {"email": BENCHMARK_EMAIL},
+        )
+        seeded = await db.scalar(
+            text("SELECT count(*) FROM posts WHERE user_id = :id"), {"id": user_id}
+        )
+        await db.commit()
+    return user_id, seeded
+
+
+async def seed(user_id, seeded: int, posts: int, batch: int) -> None:
+    for start in range(seeded + 1, posts + 1, batch):
+        stop = min(start + batch - 1, posts)
+        async with async_session() as db:
+            await db.execute(
+                SEED_POSTS,
+                {"words": WORDS, "user_id": user_id, "start": start, "stop": stop},
+            )
+            await db.commit()
+        print(f"seeded {stop}/{posts}")
+
+    async with engine.connect() as conn:
+        await conn.execute(text("ANALYZE posts"))
+        await conn.commit()
+
+
+async def timed_page(user_id, q: str, cursor, runs: int) -> tuple[list, dict]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        async with async_session() as db:
+            result = await db.execute(
+                search_posts_query(user_id, q, cursor, SEARCH_PAGE_SIZE)
+            )
+            page = build_search_page(result.all(), SEARCH_PAGE_SIZE, serialize_post)
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings), page
+
+
+async def main(posts: int, batch: int, runs: int) -> None:
+    user_id, seeded = await benchmark_user()
+    if seeded < posts:
+        await seed(user_id, seeded, posts, batch)
+
+    for name, q in QUERIES.items():
+        async with engine.connect() as conn:
+            plan = await explain_query(
+                conn,
+                search_posts_query(user_id, q, None, SEARCH_PAGE_SIZE),
+                analyze=True,
+            )
+        nodes = list(plan_nodes(plan["Plan"]))
+        scanned = [node for node in nodes if node.get("Relation Name") == "posts"]
+        seq_scans = [
+            node.get("Relation Name")
+            for node in nodes
+            if node["Node Type"] == "Seq Scan"
+        ]
+
+        first, page = await timed_page(user_id, q, None, runs)
+        second = []
+        if page["next_cursor"]:
+            second, _ = await timed_page(user_id, q, page["next_cursor"], runs)
+
+        print(
+            name,
+            {
+                "q": q,
+                "matches": scanned[0]["Actual Rows"] if scanned else 0,
+                "plan": sorted({node["Node Type"] for node in nodes}),
+                "seq_scans": seq_scans,
+                "explain_ms": plan["Execution Time"],
+                "page1_p50_ms": round(statistics.median(first), 2),
+                "page1_p95_ms": round(first[int(len(first) * 0.95) - 1], 2),
+                "page2_p50_ms": round(statistics.median(second), 2) if second else None,
+            },
+        )
+
+    await engine.dispose()
+
+
+async def drop() -> None:
+    async with async_session() as db:
+        # posts cascade with the user
+        await db.execute(
+            text("DELETE FROM users WHERE email = :email"), {"email": BENCHMARK_EMAIL}
+        )
+        await db.commit()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=50_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--drop", action="store_true")
+    args = parser.parse_args()
+    if args.drop:
+        asyncio.run(drop())
+    else:
+        asyncio.run(main(args.posts, args.batch, args.runs))
@@ -0,0 +1,115 @@
+"""Encoding a feed page: response_model + stdlib json vs. ORJSONResponse.
+
+Run from backend/: python -m benchmarks.serialization --posts 1000
+
+"response_model" repeats what FastAPI does with a returned dict (validate
+into PostPage, dump to JSON-compatible Python, JSONResponse), "orjson" is
+the FAST_JSON_RESPONSES path. Both start from the dicts serialize_post
+builds, so the database and the ORM are left out of the numbers.
+"""
+
+import argparse, json, os, time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+# app.config needs these, the benchmark never talks to a database or S3
+for key, value in {
+    "DATABASE_URL": "sqlite+aiosqlite://",
+    "JWT_ALGORITHM": "HS256",
+    "JWT_SECRET": "benchmark",
+    "AWS_ACCESS_KEY_ID": "x",
+    "AWS_SECRET_ACCESS_KEY": "x",
+    "AWS_BUCKET_NAME": "x",
+    "AWS_REGION": "us-east-1",
+}.items():
+    os.environ.setdefault(key, value)
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.endpoints.post import build_feed_page
+from app.models.posts import Posts
+from app.models.user import Users
+from app.schemas.post import PostPage
+
+IMAGE_VARIANTS = {
+    "webp": {
+        "160": "https://cdn.example.com/p/160.webp",
+        "640": "https://cdn.example.com/p/640.webp",
+    },
+    "jpeg": {
+        "160": "https://cdn.example.com/p/160.jpg",
+        "640": "https://cdn.example.com/p/640.jpg",
+    },
+}
+
+
+def feed_page(size: int) -> dict:
+    author = Users(id=uuid4(), first_name="ada", last_name="lovelace")
+    now = datetime.now()
+    rows = []
+    for i in range(size):
+        post = Posts(
+            id=uuid4(),
+            text=f"post {i} " + "lorem ipsum dolor sit amet " * 4,
+            created_at=now - timedelta(seconds=i),
+            like_count=i % 97,
+            reply_count=i % 13,
+            image_path="https://cdn.example.com/p/original.jpg" if i % 3 else None,
+            image_variants=IMAGE_VARIANTS if i % 3 else None,
+            user=author,
+        )
+        rows.append((post, i % 2 == 0))
+    # the page is exactly `size` posts, no next_cursor row
+    return build_feed_page(rows, size)
+
+
+# FastAPI builds this once per route as well
+page_adapter = TypeAdapter(PostPage)
+
+
+def with_response_model(page: dict) -> bytes:
+    value = page_adapter.validate_python(page, from_attributes=True)
+    return JSONResponse(page_adapter.dump_python(value, mode="json")).body
+
+
+def with_orjson(page: dict) -> bytes:
+    return ORJSONResponse(page).body
+
+
+def measure(encode, page: dict, rounds: int) -> dict:
+    encode(page)  # warm up pydantic's validators and serializers
+    start = time.perf_counter()
+    for _ in range(rounds):
+        body = encode(page)
+    elapsed = time.perf_counter() - start
+    return {
+        "bytes": len(body),
+        "ms_per_page": round(elapsed / rounds * 1000, 2),
+        "mb_per_s": round(len(body) * rounds / elapsed / 1e6, 1),
+    }
+
+
+def main(posts: int, rounds: int) -> None:
+    page = feed_page(posts)
+    # same document, only the key order follows the schema on one side
+    assert json.loads(with_response_model(page)) == json.loads(with_orjson(page))
+    results = {
+        "response_model": measure(with_response_model, page, rounds),
+        "orjson": measure(with_orjson, page, rounds),
+    }
+    for name, result in results.items():
+        print(name.ljust(16), result)
+
+    speedup = (
+        results["response_model"]["ms_per_page"] / results["orjson"]["ms_per_page"]
+    )
+    print(f"orjson is {speedup:.1f}x faster on {posts} posts")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    main(args.posts, args.rounds)
@@ -1,9 +1,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from app.endpoints import auth, post, chat
+from app.endpoints import auth, post, chat, search, metrics
 from contextlib import asynccontextmanager
-from app.database import Base, engine
+from app.database import Base, engine, read_engine
+from app.workers import jobs
+from app.like_buffer import like_buffer
+from app.websocket import manager
+from app.etags import versions
+from app.images import shutdown_executor
+from app.recommendations import refresh_recommendations
+from app.config import settings
+from app.instrumentation import QueryStatsMiddleware, instrument_engine
 import os
 
 
@@ -12,11 +20,25 @@ async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+    jobs.every(settings.FOLLOW_RECOMMENDATIONS_REFRESH_SECONDS, refresh_recommendations)
+    await jobs.start()
+    await manager.start()
+    await versions.start()
+    await like_buffer.start()
     yield
+    await like_buffer.stop()
+    await manager.close()
+    await jobs.stop()
+    shutdown_executor()
 
 
 app = FastAPI(title="STEAM Project", lifespan=lifespan)
 
+instrument_engine(engine)
+if read_engine is not engine:
+    instrument_engine(read_engine)
+app.add_middleware(QueryStatsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -28,3 +50,6 @@ app.add_middleware(
 app.include_router(auth.router, prefix="/api")
 app.include_router(post.router, prefix="/api")
 app.include_router(chat.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
+app.include_router(metrics.prometheus_router)
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+# app.config reads these at import time, the tests run against SQLite and moto
+for key, value in {
+    "DATABASE_URL": "sqlite+aiosqlite://",
+    "JWT_ALGORITHM": "HS256",
+    "JWT_SECRET": "test",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_BUCKET_NAME": "test-bucket",
+    "AWS_REGION": "us-east-1",
+}.items():
+    os.environ.setdefault(key, value)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def database(tmp_path):
+    """An empty SQLite database with the full schema, as a session factory."""
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import main  # noqa: F401  registers every model on Base
+    from app.database import Base
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
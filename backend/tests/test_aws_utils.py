@@ -0,0 +1,81 @@
+import asyncio, hashlib, io, threading, time
+
+import boto3
+import pytest
+from fastapi import UploadFile
+from moto import mock_aws
+from starlette.datastructures import Headers
+
+from app import aws_utils
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def bucket():
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket=aws_utils.BUCKET)
+        yield s3
+
+
+def upload_file(content: bytes, filename: str = "cat.JPG") -> UploadFile:
+    return UploadFile(
+        io.BytesIO(content),
+        filename=filename,
+        headers=Headers({"content-type": "image/jpeg"}),
+    )
+
+
+async def test_upload_is_keyed_by_content_hash(bucket):
+    content = b"\xff\xd8 not really a jpeg"
+
+    url = await aws_utils.upload_image(upload_file(content), prefix="posts")
+
+    key = f"posts/{hashlib.sha256(content).hexdigest()}.jpg"
+    assert url == aws_utils.object_url(key)
+    stored = bucket.get_object(Bucket=aws_utils.BUCKET, Key=key)
+    assert stored["Body"].read() == content
+    assert stored["ContentType"] == "image/jpeg"
+
+
+async def test_extension_falls_back_to_content_type(bucket):
+    url = await aws_utils.upload_image(upload_file(b"jpeg", filename="blob"))
+
+    assert url.endswith(".jpg")
+
+
+async def test_existing_object_is_not_uploaded_again(bucket, monkeypatch):
+    content = b"same bytes"
+    first = await aws_utils.upload_image(upload_file(content))
+
+    def fail(**kwargs):
+        raise AssertionError("uploaded an object that already exists")
+
+    monkeypatch.setattr(aws_utils.storage, "upload_fileobj", fail)
+    second = await aws_utils.upload_image(upload_file(content, filename="copy.jpg"))
+
+    assert second == first
+
+
+async def test_concurrent_uploads_are_limited(monkeypatch):
+    lock = threading.Lock()
+    running, peak = 0, 0
+
+    def upload(fileobj, key, content_type):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+
+    monkeypatch.setattr(aws_utils, "_upload", upload)
+    monkeypatch.setattr(aws_utils, "upload_slots", asyncio.Semaphore(2))
+
+    await asyncio.gather(
+        *(aws_utils.upload_image(upload_file(b"image %d" % i)) for i in range(6))
+    )
+
+    assert peak == 2
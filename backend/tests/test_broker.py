@@ -0,0 +1,107 @@
+import asyncio, os
+
+import pytest
+
+from app.broker import Broker, InMemoryBroker, PostgresBroker
+
+pytestmark = pytest.mark.anyio
+
+# PostgresBroker needs a server, e.g. postgresql://postgres@localhost/postgres
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+
+@pytest.fixture(params=["memory", "postgres"])
+async def broker(request):
+    if request.param == "memory":
+        yield InMemoryBroker()
+        return
+    if not POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    broker = PostgresBroker(POSTGRES_URL)
+    await broker.start()
+    yield broker
+    await broker.close()
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.messages: list[str] = []
+        self.arrived = asyncio.Event()
+
+    async def __call__(self, message: str) -> None:
+        self.messages.append(message)
+        self.arrived.set()
+
+    async def wait(self) -> None:
+        await asyncio.wait_for(self.arrived.wait(), timeout=5)
+
+
+async def settle() -> None:
+    # NOTIFYs arrive asynchronously, give late ones the chance to show up
+    await asyncio.sleep(0.2)
+
+
+async def test_publish_reaches_subscriber(broker):
+    handler = Recorder()
+    await broker.subscribe("feed", handler)
+
+    await broker.publish("feed", "hello")
+
+    await handler.wait()
+    assert handler.messages == ["hello"]
+
+
+async def test_messages_keep_their_order(broker):
+    handler = Recorder()
+    await broker.subscribe("feed", handler)
+
+    for i in range(5):
+        await broker.publish("feed", str(i))
+
+    await settle()
+    assert handler.messages == ["0", "1", "2", "3", "4"]
+
+
+async def test_unsubscribe_stops_delivery(broker):
+    handler = Recorder()
+    await broker.subscribe("feed", handler)
+    await broker.unsubscribe("feed")
+
+    await broker.publish("feed", "hello")
+
+    await settle()
+    assert handler.messages == []
+
+
+async def test_channels_are_isolated(broker):
+    feed, chat = Recorder(), Recorder()
+    await broker.subscribe("feed", feed)
+    await broker.subscribe("chat_1", chat)
+
+    await broker.publish("chat_1", "hi")
+
+    await chat.wait()
+    await settle()
+    assert chat.messages == ["hi"]
+    assert feed.messages == []
+
+
+async def test_publish_without_subscriber_is_dropped(broker):
+    handler = Recorder()
+    await broker.subscribe("feed", handler)
+
+    await broker.publish("chat_1", "nobody listens")
+    await broker.publish("feed", "hello")
+
+    await handler.wait()
+    await settle()
+    assert handler.messages == ["hello"]
+
+
+async def test_incomplete_broker_cannot_be_created():
+    class PublishOnly(Broker):
+        async def publish(self, channel: str, message: str) -> None:
+            pass
+
+    with pytest.raises(TypeError):
+        PublishOnly()
@@ -0,0 +1,21 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from app.endpoints.chat import MAX_MESSAGE_LENGTH, SendMessageRequest
+
+
+def test_longest_message_fits_a_notify_payload():
+    # 4 byte characters are the worst case once encoded as UTF-8
+    content = "\U0001F600" * MAX_MESSAGE_LENGTH
+    message = SendMessageRequest(content=content)
+    event = {"type": "new_message", "message": {"content": message.content}}
+
+    assert len(json.dumps(event, ensure_ascii=False).encode()) < 8000
+
+
+@pytest.mark.parametrize("content", ["", "x" * (MAX_MESSAGE_LENGTH + 1)])
+def test_message_length_is_checked(content):
+    with pytest.raises(ValidationError):
+        SendMessageRequest(content=content)
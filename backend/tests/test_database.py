@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import main  # noqa: F401  registers every model on Base
+from app.database import Base, InstrumentedPool
+from app.models.posts import Posts
+from app.models.user import Users
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_create_all_works_on_sqlite():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    async with AsyncSession(engine) as db:
+        user = Users(
+            first_name="ada",
+            last_name="lovelace",
+            email="ada@example.com",
+            hashed_password="x",
+        )
+        db.add(user)
+        await db.flush()
+        db.add(Posts(text="hello", user_id=user.id))
+        await db.commit()
+
+        # only Postgres fills the search vectors
+        assert await db.scalar(select(Posts.text)) == "hello"
+        assert await db.scalar(select(Posts.search_vector)) is None
+
+    await engine.dispose()
+
+
+async def test_pool_counts_only_blocked_checkouts_as_waits(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedPool,
+        pool_size=1,
+        max_overflow=0,
+    )
+    pool = engine.pool
+
+    for _ in range(3):
+        async with engine.connect():
+            pass
+    assert (pool.checkouts, pool.waits) == (3, 0)
+
+    holder = await engine.connect()
+    waiter = asyncio.create_task(engine.connect().start())
+    await asyncio.sleep(0.05)
+    await holder.close()
+    await (await waiter).close()
+
+    assert (pool.checkouts, pool.waits) == (5, 1)
+    assert pool.wait_seconds >= 0.04
+    await engine.dispose()
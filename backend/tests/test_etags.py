@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from app.broker import InMemoryBroker
+from app.etags import FEED, ResourceVersions
+
+pytestmark = pytest.mark.anyio
+
+
+class RecordingBroker(InMemoryBroker):
+    """Keeps published messages so a test decides when, and in which order,
+    they reach the other workers."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.published: list[str] = []
+
+    async def publish(self, channel: str, message: str) -> None:
+        self.published.append(message)
+
+
+def worker() -> ResourceVersions:
+    return ResourceVersions(RecordingBroker(), ttl=300, settle=0)
+
+
+async def test_reordered_messages_do_not_roll_back():
+    a, b = worker(), worker()
+    await a.bump(FEED)
+    await a.bump(FEED)
+    first, second = a.broker.published
+
+    await b._receive(second)
+    await b._receive(first)
+
+    assert b.stamp(FEED) == a.stamp(FEED)
+    assert b.stats()["stale"] == 1
+
+
+async def test_own_bumps_coming_back_change_nothing():
+    a = worker()
+    await a.bump(FEED)
+    stamp = a.stamp(FEED)
+
+    await a._receive(a.broker.published[0])
+
+    assert a.stamp(FEED) == stamp
+    assert a.stats()["received"] == 0
+
+
+async def test_bump_after_a_fast_clock_still_wins():
+    a, b = worker(), worker()
+    await a.bump(FEED)
+    # a's clock runs an hour ahead of b's
+    message = json.loads(a.broker.published[0])
+    message["version"][0] += 3600 * 10**9
+    await a._receive(json.dumps(message))
+    await b._receive(json.dumps(message))
+
+    await b.bump(FEED)
+    await a._receive(b.broker.published[0])
+
+    assert a.stamp(FEED) == b.stamp(FEED)
+    assert b.stamp(FEED) != "-".join(map(str, message["version"]))
+
+
+async def test_unchanged_tokens_are_renewed_after_ttl():
+    a = worker()
+    stamp = a.stamp(FEED)
+    a.ttl = -1
+
+    assert a.stamp(FEED) != stamp
+    assert a.stats()["expired"] == 1
@@ -0,0 +1,37 @@
+import os, subprocess, sys
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import make_url
+
+# the audit seeds ~80 rows per user and leaves them behind, use a scratch database
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+BACKEND = Path(__file__).resolve().parent.parent
+USERS = 20_000
+MIN_ROWS = 1_000
+
+
+def database_url(driver: str) -> str:
+    url = make_url(POSTGRES_URL).set(drivername=f"postgresql+{driver}")
+    return url.render_as_string(hide_password=False)
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+def test_endpoints_do_not_seq_scan_big_tables():
+    # built without alembic.ini so env.py leaves the test run's logging alone
+    config = Config()
+    config.set_main_option("script_location", str(BACKEND / "alembic"))
+    config.set_main_option("sqlalchemy.url", database_url("psycopg2"))
+    command.upgrade(config, "head")
+
+    audit = subprocess.run(
+        [sys.executable, "-m", "benchmarks.explain_audit"]
+        + ["--users", str(USERS), "--min-rows", str(MIN_ROWS)],
+        cwd=BACKEND,
+        env={**os.environ, "DATABASE_URL": database_url("asyncpg")},
+        capture_output=True,
+        text=True,
+    )
+    assert audit.returncode == 0, audit.stdout + audit.stderr
@@ -0,0 +1,54 @@
+import io
+
+import pytest
+from PIL import Image
+
+from app.images import MAX_IMAGE_PIXELS, render_variants
+
+
+def encode(image: Image.Image, image_format: str = "PNG") -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def decode(variants, name: str, width: int) -> Image.Image:
+    content = next(c for n, w, c in variants if n == name and w == width)
+    return Image.open(io.BytesIO(content))
+
+
+def test_variants_are_never_upscaled():
+    variants = render_variants(encode(Image.new("RGB", (500, 250), "red")))
+
+    widths = {width for _, width, _ in variants}
+    assert widths == {160, 320, 500}
+    assert decode(variants, "jpeg", 160).size == (160, 80)
+    assert len(variants) == len(widths) * 2
+
+
+def test_webp_keeps_transparency_and_jpeg_is_flattened_on_white():
+    image = Image.new("RGBA", (200, 100), (255, 0, 0, 0))
+    variants = render_variants(encode(image))
+
+    webp = decode(variants, "webp", 160)
+    assert webp.mode == "RGBA"
+    assert webp.getpixel((80, 40))[3] == 0
+
+    jpeg = decode(variants, "jpeg", 160)
+    assert jpeg.mode == "RGB"
+    assert all(channel > 240 for channel in jpeg.getpixel((80, 40)))
+
+
+def test_opaque_images_stay_rgb():
+    variants = render_variants(encode(Image.new("RGB", (200, 100)), "JPEG"))
+
+    assert decode(variants, "webp", 160).mode == "RGB"
+
+
+def test_oversized_images_are_refused_before_decoding():
+    # blank and 1 bit deep: a few kB of PNG that would decode to gigabytes
+    width = MAX_IMAGE_PIXELS // 1000 + 1
+    image = Image.new("1", (width, 1000))
+
+    with pytest.raises(Image.DecompressionBombError):
+        render_variants(encode(image))
@@ -0,0 +1,55 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.instrumentation import (
+    QueryStatsMiddleware,
+    RequestStats,
+    current_stats,
+    instrument_engine,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+def requests_seen(route: str, status: str) -> float:
+    labels = {"method": "GET", "route": route, "status": status}
+    return REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) or 0
+
+
+async def test_failing_requests_are_recorded_as_500():
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    before = requests_seen("/boom", "500")
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        response = await c.get("/boom")
+
+    assert response.status_code == 500
+    assert requests_seen("/boom", "500") == before + 1
+
+
+async def test_statements_and_affected_rows_are_counted():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    instrument_engine(engine)
+    stats = RequestStats({"method": "GET"})
+    token = current_stats.set(stats)
+    try:
+        async with engine.begin() as connection:
+            await connection.execute(text("CREATE TABLE t (id INTEGER)"))
+            await connection.execute(text("INSERT INTO t VALUES (1), (2), (3)"))
+            await connection.execute(text("UPDATE t SET id = id + 1 WHERE id > 1"))
+    finally:
+        current_stats.reset(token)
+        await engine.dispose()
+
+    assert stats.queries == 3
+    assert stats.rows == 3 + 2
@@ -0,0 +1,107 @@
+from uuid import uuid4
+
+import pytest
+
+from app import like_buffer as module
+from app.like_buffer import LikeBuffer
+from app.models.posts import PostReply, Posts
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeSession:
+    """Stands in for async_session; fails the statement numbered `fail_at`."""
+
+    def __init__(self, buffer: LikeBuffer, fail_at: int | None = None) -> None:
+        self.buffer = buffer
+        self.fail_at = fail_at
+        self.statements = []
+        self.committed = False
+        self.on_execute = None
+        # what a read would add to the stored counts while the session closes
+        self.seen_on_close: dict | None = None
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.seen_on_close = {
+            key: self.buffer.pending_delta(model, key)
+            for model, key in self.buffer.keys
+        }
+
+    async def execute(self, statement):
+        if self.on_execute:
+            self.on_execute()
+        self.statements.append(statement)
+        if len(self.statements) == self.fail_at:
+            raise RuntimeError("connection lost")
+
+    async def commit(self):
+        self.committed = True
+
+
+@pytest.fixture
+def buffer():
+    buffer = LikeBuffer(enabled=True, interval=1)
+    post, reply = uuid4(), uuid4()
+    buffer.keys = [(Posts, post), (PostReply, reply)]
+    buffer.add(Posts, post, 3)
+    buffer.add(PostReply, reply, -1)
+    return buffer
+
+
+def use_session(monkeypatch, session: FakeSession) -> None:
+    monkeypatch.setattr(module, "async_session", session)
+
+
+async def test_failed_flush_puts_deltas_back_once(buffer, monkeypatch):
+    (_, post), (_, reply) = buffer.keys
+    # the posts UPDATE went through, the replies one fails
+    session = FakeSession(buffer, fail_at=2)
+    session.on_execute = lambda: buffer.add(Posts, post, 1)
+    use_session(monkeypatch, session)
+
+    await buffer.flush()
+
+    assert not session.committed
+    assert buffer.failed_flushes == 1
+    assert buffer.pending_delta(Posts, post) == 3 + 2
+    assert buffer.pending_delta(PostReply, reply) == -1
+    assert buffer.stats()["pending"] == 2
+
+    # the retry writes everything, exactly once
+    session = FakeSession(buffer)
+    use_session(monkeypatch, session)
+    await buffer.flush()
+
+    assert session.committed
+    assert buffer.pending_delta(Posts, post) == 0
+    assert buffer.pending_delta(PostReply, reply) == 0
+    assert buffer.flushed == 2
+
+
+async def test_flush_stops_counting_deltas_once_committed(buffer, monkeypatch):
+    (_, post), (_, reply) = buffer.keys
+    session = FakeSession(buffer)
+    use_session(monkeypatch, session)
+
+    await buffer.flush()
+
+    assert session.committed
+    assert session.seen_on_close == {post: 0, reply: 0}
+
+
+async def test_deltas_count_while_their_flush_runs(buffer, monkeypatch):
+    (_, post), _ = buffer.keys
+    seen = []
+    session = FakeSession(buffer)
+    session.on_execute = lambda: seen.append(buffer.pending_delta(Posts, post))
+    use_session(monkeypatch, session)
+
+    await buffer.flush()
+
+    assert seen == [3, 3]
@@ -0,0 +1,155 @@
+from uuid import uuid4
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from jose import jwt
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import main  # noqa: F401  registers every model on Base
+from app import utils
+from app.config import settings
+from app.database import Base, PrimarySession, recent_writers
+from app.models.user import Users
+
+pytestmark = pytest.mark.anyio
+
+
+class Database:
+    """A SQLite file standing in for the primary or the replica."""
+
+    def __init__(self, url: str, **options) -> None:
+        self.engine = create_async_engine(url)
+        self.session = sessionmaker(
+            self.engine, class_=AsyncSession, expire_on_commit=False, **options
+        )
+        self.checkouts = 0
+
+        @event.listens_for(self.engine.sync_engine, "checkout")
+        def count(*args):
+            self.checkouts += 1
+
+    async def create(self, *users: dict) -> None:
+        async with self.engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with self.session() as db:
+            db.add_all(Users(**user) for user in users)
+            await db.commit()
+        self.checkouts = 0
+
+
+def new_user() -> dict:
+    return {
+        "id": uuid4(),
+        "first_name": "ada",
+        "last_name": "lovelace",
+        "email": f"{uuid4().hex}@example.com",
+        "hashed_password": "x",
+    }
+
+
+def auth(user: dict) -> dict:
+    claims = {"data": user["email"], "sub": str(user["id"])}
+    token = jwt.encode(claims, settings.JWT_SECRET, settings.JWT_ALGORITHM)
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+async def databases(tmp_path, monkeypatch):
+    primary = Database(
+        f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}",
+        sync_session_class=PrimarySession,
+    )
+    replica = Database(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(utils, "async_session", primary.session)
+    monkeypatch.setattr(utils, "read_session", replica.session)
+    utils.user_cache.clear()
+    recent_writers.clear()
+    yield primary, replica
+    await primary.engine.dispose()
+    await replica.engine.dispose()
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    calls = []
+    decode = jwt.decode
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(utils.jwt, "decode", counting)
+    return calls
+
+
+@pytest.fixture
+async def client(databases):
+    app = FastAPI()
+    primary, _ = databases
+
+    @app.get("/read")
+    async def read(user=Depends(utils.get_current_user), db=Depends(utils.get_read_db)):
+        return {"id": str(user.id), "primary": db.bind is primary.engine}
+
+    @app.post("/write")
+    async def write(user=Depends(utils.get_current_user), db=Depends(utils.get_db)):
+        await db.commit()
+        return {"id": str(user.id)}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+async def test_reads_stay_off_the_primary(databases, client, decodes):
+    primary, replica = databases
+    user = new_user()
+    await primary.create(user)
+    await replica.create(user)
+
+    response = await client.get("/read", headers=auth(user))
+
+    assert response.json() == {"id": str(user["id"]), "primary": False}
+    assert (primary.checkouts, replica.checkouts) == (0, 1)
+    assert replica.checkouts == 1
+    # get_current_user and get_read_db share one decoded subject
+    assert len(decodes) == 1
+
+
+async def test_new_user_is_looked_up_on_the_primary(databases, client):
+    primary, replica = databases
+    user = new_user()
+    await primary.create(user)
+    # the replica has not caught up with the sign up yet
+    await replica.create()
+
+    response = await client.get("/read", headers=auth(user))
+
+    assert response.status_code == 200
+    assert response.json()["primary"] is False
+    assert (primary.checkouts, replica.checkouts) == (1, 1)
+
+
+async def test_writes_pin_reads_to_the_primary(databases, client, decodes):
+    primary, replica = databases
+    user, other = new_user(), new_user()
+    await primary.create(user, other)
+    await replica.create(user, other)
+
+    assert (await client.post("/write", headers=auth(user))).status_code == 200
+    assert len(decodes) == 1
+
+    mine = await client.get("/read", headers=auth(user))
+    theirs = await client.get("/read", headers=auth(other))
+
+    assert mine.json()["primary"] is True
+    assert theirs.json()["primary"] is False
+
+
+async def test_invalid_token_is_rejected(databases, client):
+    response = await client.get("/read", headers={"Authorization": "Bearer nope"})
+
+    assert response.status_code == 401
@@ -0,0 +1,111 @@
+import pytest
+from sqlalchemy import insert, select
+
+from app import recommendations
+from app.models.recommendation import FollowRecommendation
+from app.models.user import Users, followers_table
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def session(database, monkeypatch):
+    monkeypatch.setattr(recommendations, "async_session", database)
+    recommendations.popular_users.clear()
+    return database
+
+
+async def add_users(session, **follower_counts) -> dict:
+    async with session() as db:
+        users = {
+            name: Users(
+                first_name=name,
+                last_name=name,
+                email=f"{name}@example.com",
+                hashed_password="x",
+                follower_count=count,
+            )
+            for name, count in follower_counts.items()
+        }
+        db.add_all(users.values())
+        await db.commit()
+    return {name: user.id for name, user in users.items()}
+
+
+async def follow(session, *pairs) -> None:
+    async with session() as db:
+        await db.execute(
+            insert(followers_table),
+            [{"follower_id": a, "followee_id": b} for a, b in pairs],
+        )
+        await db.commit()
+
+
+async def recommended(session, user_id) -> list:
+    async with session() as db:
+        rows = await db.execute(
+            select(FollowRecommendation.candidate_id, FollowRecommendation.score)
+            .where(FollowRecommendation.user_id == user_id)
+            .order_by(FollowRecommendation.candidate_id)
+        )
+        return rows.all()
+
+
+async def test_friends_of_friends_are_ranked_by_mutual_follows(session):
+    ids = await add_users(session, ann=0, bob=0, cid=0, dan=0)
+    await follow(
+        session,
+        (ids["ann"], ids["bob"]),
+        (ids["ann"], ids["cid"]),
+        (ids["bob"], ids["dan"]),
+        (ids["cid"], ids["dan"]),
+        # ann follows cid already, bob's follow of her does not count
+        (ids["bob"], ids["cid"]),
+        (ids["bob"], ids["ann"]),
+    )
+
+    await recommendations.recompute_recommendations(ids["ann"])
+
+    assert await recommended(session, ids["ann"]) == [(ids["dan"], 2)]
+
+
+async def test_recompute_replaces_previous_rows(session):
+    ids = await add_users(session, ann=0, bob=0, cid=0)
+    await follow(session, (ids["ann"], ids["bob"]), (ids["bob"], ids["cid"]))
+    await recommendations.recompute_recommendations(ids["ann"])
+
+    await follow(session, (ids["ann"], ids["cid"]))
+    await recommendations.recompute_recommendations(ids["ann"])
+
+    assert await recommended(session, ids["ann"]) == []
+
+
+async def test_refresh_covers_every_follower(session, monkeypatch):
+    monkeypatch.setattr(recommendations, "REFRESH_BATCH_SIZE", 1)
+    ids = await add_users(session, ann=0, bob=0, cid=0)
+    await follow(
+        session,
+        (ids["ann"], ids["bob"]),
+        (ids["bob"], ids["cid"]),
+        (ids["cid"], ids["ann"]),
+    )
+
+    await recommendations.refresh_all_recommendations()
+
+    assert await recommended(session, ids["ann"]) == [(ids["cid"], 1)]
+    assert await recommended(session, ids["bob"]) == [(ids["ann"], 1)]
+    assert await recommended(session, ids["cid"]) == [(ids["bob"], 1)]
+
+
+async def test_popular_users_stand_in_for_friends_of_friends(session, monkeypatch):
+    monkeypatch.setattr(recommendations.settings, "FOLLOW_RECOMMENDATIONS_SIZE", 2)
+    ids = await add_users(session, ann=0, bob=30, cid=20, dan=10, eve=5)
+    await follow(session, (ids["ann"], ids["bob"]))
+
+    async with session() as db:
+        popular = await recommendations.popular_recommendations(db, ids["ann"])
+        newcomer = await recommendations.popular_recommendations(db, ids["cid"])
+
+    # followed users and the user themself are left out
+    assert [row["id"] for row in popular] == [ids["cid"], ids["dan"]]
+    assert [row["id"] for row in newcomer] == [ids["bob"], ids["dan"]]
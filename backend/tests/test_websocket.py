@@ -0,0 +1,110 @@
+import asyncio, json
+
+import pytest
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect as ClientDisconnect
+
+from app.broker import InMemoryBroker
+from app.config import settings
+from app.websocket import ConnectionManager
+
+
+def test_evicted_socket_ends_with_disconnect():
+    manager = ConnectionManager(InMemoryBroker())
+    outcome = []
+    app = FastAPI()
+
+    @app.websocket("/ws")
+    async def chat(websocket: WebSocket):
+        await websocket.accept()
+        await manager.connect_chat("1", websocket)
+        try:
+            while True:
+                if await manager.receive_text(websocket) == "evict":
+                    await manager.evict(websocket)
+        except WebSocketDisconnect as disconnect:
+            outcome.append(disconnect.code)
+            await manager.disconnect_chat("1", websocket)
+
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws") as websocket:
+            websocket.send_text("evict")
+            with pytest.raises(ClientDisconnect):
+                websocket.receive_text()
+
+    assert outcome == [1013]
+    assert manager.stats()["evicted_connections"] == 1
+    assert manager.stats()["connections"] == 0
+
+
+class FakeSocket:
+    def __init__(self) -> None:
+        self.sent: list[dict] = []
+        self.closed = False
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, message: str) -> None:
+        self.sent.append(json.loads(message))
+
+    async def close(self, code: int) -> None:
+        self.closed = True
+
+
+async def feed_manager(monkeypatch, history_size: int = 10) -> ConnectionManager:
+    monkeypatch.setattr(settings, "WS_FEED_HISTORY_SIZE", history_size)
+    manager = ConnectionManager(InMemoryBroker())
+    # keep the feed subscribed, as a connected reader would
+    await manager.connect(FakeSocket())
+    return manager
+
+
+async def join(manager: ConnectionManager, cursor: str) -> FakeSocket:
+    websocket = FakeSocket()
+    await manager.connect(websocket)
+    await manager.join_feed(websocket, cursor)
+    await asyncio.sleep(0)  # let the writer task drain the outbox
+    return websocket
+
+
+@pytest.mark.anyio
+async def test_snapshot_cursor_exists_before_any_event(monkeypatch):
+    manager = await feed_manager(monkeypatch)
+
+    cursor = manager.feed_cursor()
+    assert cursor is not None
+    assert manager.can_resume(cursor)
+
+    await manager.broadcast({"type": "post_deleted", "id": "1"})
+    websocket = await join(manager, cursor)
+
+    assert [event["id"] for event in websocket.sent] == ["1"]
+
+
+@pytest.mark.anyio
+async def test_resumes_from_the_last_event_dropped_from_history(monkeypatch):
+    manager = await feed_manager(monkeypatch, history_size=2)
+    for id in "123":
+        await manager.broadcast({"type": "post_deleted", "id": id})
+        if id == "1":
+            first = manager.feed_cursor()
+
+    websocket = await join(manager, first)
+
+    assert [event["id"] for event in websocket.sent] == ["2", "3"]
+
+
+@pytest.mark.anyio
+async def test_cursor_older_than_history_is_dropped(monkeypatch):
+    manager = await feed_manager(monkeypatch, history_size=1)
+    cursor = manager.feed_cursor()
+    for id in "12":
+        await manager.broadcast({"type": "post_deleted", "id": id})
+
+    websocket = await join(manager, cursor)
+
+    assert not manager.can_resume(cursor)
+    assert websocket.sent == []
+    assert websocket.closed
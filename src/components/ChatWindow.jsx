@@ -110,7 +110,7 @@ export default function ChatWindow({ chat, onBack }) {
             }
 
             const data = await response.json();
-            setMessages(data);
+            setMessages(data.messages);
         } catch (err) {
             console.error("Error loading messages:", err);
         } finally {
@@ -321,6 +321,7 @@ export default function ChatWindow({ chat, onBack }) {
                         type="text"
                         value={newMessage}
                         onChange={(e) => setNewMessage(e.target.value)}
+                        maxLength={1000}
                         placeholder="Start a new message"
                         className="flex-1 px-4 py-3 rounded-full focus:outline-none focus:ring-2 focus:ring-blue-500"
                         style={{
@@ -47,9 +47,10 @@ export default function PostCard({ post, onReply, onLikeUpdate }) {
             const token = localStorage.getItem("access_token");
 
             const response = await fetch(
-                `${apiClient.BASE_URL}/api/post/create_delete_like/${post.id}/`,
+                `${apiClient.BASE_URL}/api/post/${post.id}/like`,
                 {
-                    method: "POST",
+                    // PUT/DELETE are idempotent, a double click cannot flip the like back
+                    method: previousIsLiked ? "DELETE" : "PUT",
                     headers: {
                         Authorization: `Bearer ${token}`,
                     },
@@ -60,6 +61,9 @@ export default function PostCard({ post, onReply, onLikeUpdate }) {
                 throw new Error("Failed to like post");
             }
 
+            const data = await response.json();
+            setLikes(data.like_count);
+
             // Notify parent to refresh posts if needed
             if (onLikeUpdate) {
                 onLikeUpdate(post.id);
@@ -28,7 +28,7 @@ export default function Home() {
                 },
             });
 
-            setPosts(response);
+            setPosts(response.items);
         } catch (err) {
             setError("Failed to load posts. Please try again.");
         } finally {